@@ -0,0 +1,245 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import CRISIS_ALERT_WAL_PATH, CRISIS_ALERT_BATCH_SIZE, CRISIS_ALERT_WEBHOOK_URL
+from database import log_crisis_alerts
+
+
+class WebhookSink:
+    """Posts each delivered batch of alerts as JSON to a webhook URL"""
+
+    def __init__(self, url):
+        self.url = url
+
+    def notify(self, alerts):
+        from http_client import post_json
+        response = post_json(self.url, {"alerts": alerts})
+        response.raise_for_status()
+
+
+class CrisisAlertQueue:
+    """Durable in-process queue that moves crisis alerts off the chat turn
+
+    ``enqueue`` appends the alert to a write-ahead file and returns at once.
+    A background writer inserts queued alerts into ``crisis_alerts`` in
+    batches, fans them out to notifier sinks, then records an ack in the
+    file. Alerts that were written ahead but never acked (the process died
+    first) are replayed on the next start, so delivery is at-least-once.
+
+    A batch is retried while the database is busy or locked. Any other
+    failure is narrowed down to the alerts that cause it, which are appended
+    to a dead-letter file next to the write-ahead file instead of blocking
+    every alert queued behind them.
+    """
+
+    def __init__(self, wal_path, batch_size=50, sinks=(), retry_delay=0.5):
+        self.wal_path = wal_path
+        self.dead_letter_path = wal_path + ".dead"
+        self.batch_size = batch_size
+        self.sinks = list(sinks)
+        self.retry_delay = retry_delay
+        self.enqueued = 0
+        self.delivered = 0
+        self.write_failures = 0
+        self.dead_lettered = 0
+        self.sink_failures = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+        self._queue = queue.Queue()
+        self._wal_lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._unacked = 0
+        self._next_seq = 0
+
+        os.makedirs(os.path.dirname(wal_path) or ".", exist_ok=True)
+        self._recover()
+        self._wal = open(wal_path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, name="crisis-alert-writer", daemon=True)
+        self._thread.start()
+
+    def _recover(self):
+        pending = {}
+        if os.path.exists(self.wal_path):
+            with open(self.wal_path, encoding="utf-8") as wal:
+                for line in wal:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-write
+                        continue
+                    if "ack" in record:
+                        for seq in record["ack"]:
+                            pending.pop(seq, None)
+                    else:
+                        pending[record["seq"]] = record
+                    self._next_seq = max(self._next_seq, record.get("seq", -1) + 1)
+
+        # Rewrite the file with only the unacked alerts, then replay them
+        with open(self.wal_path, "w", encoding="utf-8") as wal:
+            for record in pending.values():
+                wal.write(json.dumps(record, ensure_ascii=False) + "\n")
+            wal.flush()
+            os.fsync(wal.fileno())
+        for record in pending.values():
+            record["enqueued_at"] = time.time()
+            self._unacked += 1
+            self._queue.put(record)
+
+    def enqueue(self, user_id, message):
+        """Record an alert durably and return without touching the database"""
+        with self._wal_lock:
+            record = {
+                "seq": self._next_seq,
+                "user_id": user_id,
+                "message": message,
+                "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self._next_seq += 1
+            # Flushed to the OS so a process crash cannot lose it; the
+            # writer fsyncs in batches to keep disk syncs off the chat turn
+            self._wal.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._wal.flush()
+            # Counted under the file lock so the writer cannot truncate
+            # the file between this write and the count
+            with self._idle:
+                self._unacked += 1
+        record["enqueued_at"] = time.time()
+        self.enqueued += 1
+        self._queue.put(record)
+        return record["seq"]
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            with self._wal_lock:
+                os.fsync(self._wal.fileno())
+
+            dead = []
+            try:
+                self._store(batch)
+            except Exception:
+                # Isolate the failing alerts; the others are stored on their own
+                for record in batch:
+                    try:
+                        self._store([record])
+                    except Exception as e:
+                        print(f"Could not store crisis alert {record['seq']}, dead-lettering it: {e}")
+                        self._dead_letter(record, e)
+                        dead.append(record)
+
+            # Sinks hear about every alert, stored or not
+            self._notify(batch)
+            self._ack(batch, dead)
+
+    def _store(self, batch):
+        while True:
+            try:
+                log_crisis_alerts([
+                    (record["user_id"], record["message"], record["timestamp"])
+                    for record in batch
+                ])
+                return
+            except sqlite3.OperationalError as e:
+                if not _is_transient(e):
+                    raise
+                # Keep the batch and retry; the alert must not be dropped
+                self.write_failures += 1
+                print(f"Could not store crisis alerts, retrying: {e}")
+                time.sleep(self.retry_delay)
+
+    def _dead_letter(self, record, error):
+        entry = {key: value for key, value in record.items() if key != "enqueued_at"}
+        entry["error"] = str(error)
+        with open(self.dead_letter_path, "a", encoding="utf-8") as dead:
+            dead.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            dead.flush()
+            os.fsync(dead.fileno())
+        self.dead_lettered += 1
+
+    def _notify(self, batch):
+        alerts = [
+            {"user_id": record["user_id"], "message": record["message"], "timestamp": record["timestamp"]}
+            for record in batch
+        ]
+        for sink in self.sinks:
+            try:
+                sink.notify(alerts)
+            except Exception as e:
+                self.sink_failures += 1
+                print(f"Crisis alert sink {type(sink).__name__} failed: {e}")
+
+    def _ack(self, batch, dead=()):
+        now = time.time()
+        stored = [record for record in batch if record not in dead]
+        for record in stored:
+            lag = now - record["enqueued_at"]
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self._total_lag += lag
+        self.delivered += len(stored)
+
+        with self._wal_lock:
+            self._wal.write(json.dumps({"ack": [record["seq"] for record in batch]}) + "\n")
+            self._wal.flush()
+            with self._idle:
+                self._unacked -= len(batch)
+                # Everything written has been delivered, so start a fresh file
+                if self._unacked == 0:
+                    self._wal.truncate(0)
+                    self._idle.notify_all()
+
+    def flush(self, timeout=None):
+        """Block until every queued alert has been delivered"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unacked == 0, timeout)
+
+    def stats(self):
+        return {
+            "queue_depth": self._unacked,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "write_failures": self.write_failures,
+            "dead_lettered": self.dead_lettered,
+            "sink_failures": self.sink_failures,
+            "last_lag_seconds": self.last_lag,
+            "max_lag_seconds": self.max_lag,
+            "average_lag_seconds": self._total_lag / self.delivered if self.delivered else 0.0,
+        }
+
+
+def _is_transient(error):
+    # Another connection holds the write lock; the same write will succeed later
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+_alert_queue = None
+_alert_queue_lock = threading.Lock()
+
+
+def get_alert_queue():
+    """Return the process-wide crisis alert queue, starting it on first use"""
+    global _alert_queue
+    if _alert_queue is None:
+        with _alert_queue_lock:
+            if _alert_queue is None:
+                sinks = [WebhookSink(CRISIS_ALERT_WEBHOOK_URL)] if CRISIS_ALERT_WEBHOOK_URL else []
+                _alert_queue = CrisisAlertQueue(CRISIS_ALERT_WAL_PATH, CRISIS_ALERT_BATCH_SIZE, sinks)
+                atexit.register(_alert_queue.flush, 5)
+    return _alert_queue
@@ -1,14 +1,20 @@
+import import_profiler
+import_profiler.install_from_env()
+
+import html
 import streamlit as st
 import os
-from config import SUPPORTED_LANGUAGES
-from database import init_database
-from auth import authenticate_user, create_user, get_user_language, update_user_language
+from config import SUPPORTED_LANGUAGES, CHAT_HISTORY_PAGE_SIZE, CHAT_RENDER_WINDOW, ROUTER_DEBUG, SESSION_TTL_HOURS
+from auth import AuthBusyError, authenticate_user, create_user, get_user_language, update_user_language
+from bootstrap import bootstrap
 from chatbot import ChatbotEngine
 from crisis_detection import CrisisDetector
-from database import save_chat_message, get_user_id
+from database import save_chat_message, get_user_id, get_chat_history_page
+from session_cookie import clear_session_cookie, read_session_cookie, write_session_cookie
+from session_tokens import issue_session, revoke_session, rotate_session
 
-# Initialize database
-init_database()
+# One-time process setup (schema migrations, background writers); no-op on reruns
+bootstrap()
 
 # Page configuration
 st.set_page_config(
@@ -87,6 +93,72 @@ if "chatbot" not in st.session_state:
     st.session_state.chatbot = None
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+if "session_token" not in st.session_state:
+    st.session_state.session_token = None
+if "history_cursor" not in st.session_state:
+    st.session_state.history_cursor = None
+if "chat_window" not in st.session_state:
+    st.session_state.chat_window = CHAT_RENDER_WINDOW
+if "cookie_checked" not in st.session_state:
+    st.session_state.cookie_checked = False
+if "cookie_update" not in st.session_state:
+    # ("write", token) or ("clear", token) for the browser, applied on the next run
+    st.session_state.cookie_update = None
+
+def turns_to_messages(rows):
+    """Expand (id, message, response, timestamp) rows into chat messages"""
+    messages = []
+    for _, message, response, _ in rows:
+        messages.append({"role": "user", "content": message})
+        messages.append({"role": "assistant", "content": response})
+    return messages
+
+def start_session(user_id, username, language, token):
+    """Populate session state for a signed-in user"""
+    st.session_state.authenticated = True
+    st.session_state.user_id = user_id
+    st.session_state.username = username
+    st.session_state.language = language
+    st.session_state.session_token = token
+    # Rehydrate only the most recent turns; older pages load on demand
+    rows, st.session_state.history_cursor = get_chat_history_page(user_id, limit=CHAT_HISTORY_PAGE_SIZE)
+    st.session_state.chat_history = turns_to_messages(rows)
+    st.session_state.chat_window = CHAT_RENDER_WINDOW
+    # The model itself is shared by the registry, so this is cheap
+    st.session_state.chatbot = ChatbotEngine(SUPPORTED_LANGUAGES.get(language, "en"))
+    st.session_state.chatbot.seed_history(st.session_state.chat_history)
+
+# A reload or reconnect starts a fresh session_state; the signed token in
+# the session cookie restores the login without another password check.
+# Each restore rotates the token, so a copied cookie works at most once.
+# The cookie is only what the browser sent when the page loaded, so it is
+# looked at once per session: never again after a logout.
+if not st.session_state.cookie_checked:
+    st.session_state.cookie_checked = True
+    url_token = st.experimental_get_query_params().get("session", [None])[0]
+    if url_token:
+        # Links from before the cookie may still carry a token; never keep it in the URL
+        st.experimental_set_query_params()
+    cookie_token = read_session_cookie()
+    token = cookie_token or url_token
+    rotated = rotate_session(token) if token else None
+    if rotated:
+        restored, token = rotated
+        start_session(*restored, token)
+        st.session_state.cookie_update = ("write", token)
+    elif cookie_token:
+        st.session_state.cookie_update = ("clear", cookie_token)
+
+# Only a token this tab was just given is stored, once; another tab may
+# have rotated the cookie since, and its token must not be overwritten
+# with one that is already revoked
+if st.session_state.cookie_update:
+    action, token = st.session_state.cookie_update
+    st.session_state.cookie_update = None
+    if action == "write":
+        write_session_cookie(token, SESSION_TTL_HOURS * 3600)
+    else:
+        clear_session_cookie(token)
 
 # Authentication section
 def show_auth():
@@ -99,19 +171,19 @@ def show_auth():
         login_password = st.text_input("Password", type="password", key="login_pass")
         
         if st.button("Login", use_container_width=True):
-            user_id = authenticate_user(login_username, login_password)
-            if user_id:
-                st.session_state.authenticated = True
-                st.session_state.user_id = user_id
-                st.session_state.username = login_username
-                st.session_state.language = get_user_language(user_id)
-                st.session_state.chatbot = ChatbotEngine(
-                    "en" if st.session_state.language == "English" else "hi"
-                )
-                st.success("Logged in successfully!")
-                st.rerun()
+            try:
+                user_id = authenticate_user(login_username, login_password)
+            except AuthBusyError as e:
+                st.warning(str(e))
             else:
-                st.error("Invalid credentials")
+                if user_id:
+                    token = issue_session(user_id)
+                    start_session(user_id, login_username, get_user_language(user_id), token)
+                    st.session_state.cookie_update = ("write", token)
+                    st.success("Logged in successfully!")
+                    st.rerun()
+                else:
+                    st.error("Invalid credentials")
     
     with col2:
         st.subheader("Register")
@@ -125,10 +197,14 @@ def show_auth():
                 st.error("Passwords don't match")
             elif len(reg_password) < 6:
                 st.error("Password must be at least 6 characters")
-            elif create_user(reg_username, reg_password, reg_email):
-                st.success("Account created! Please login.")
             else:
-                st.error("Username already exists")
+                try:
+                    if create_user(reg_username, reg_password, reg_email):
+                        st.success("Account created! Please login.")
+                    else:
+                        st.error("Username already exists")
+                except AuthBusyError as e:
+                    st.warning(str(e))
 
 # Main app
 def show_main_app():
@@ -159,7 +235,10 @@ def show_main_app():
             st.session_state.language = selected_language
             lang_code = SUPPORTED_LANGUAGES[selected_language]
             update_user_language(st.session_state.user_id, selected_language)
-            st.session_state.chatbot = ChatbotEngine(lang_code)
+            if st.session_state.chatbot is None:
+                st.session_state.chatbot = ChatbotEngine(lang_code)
+            else:
+                st.session_state.chatbot.change_language(lang_code)
             st.rerun()
         
         st.divider()
@@ -168,18 +247,34 @@ def show_main_app():
         st.subheader("Navigation")
         page = st.radio(
             "Choose a section:",
-            ["Chat", "Mood Tracker", "Therapy Modules", "Resources", "Crisis Support"]
+            ["Chat", "Mood Tracker", "Therapy Modules", "Resources", "Crisis Support", "Search", "Export Data"]
         )
         
         st.divider()
         
+        # Backend routing stats and recent decisions, for debugging
+        if ROUTER_DEBUG:
+            from backend_router import router
+            from db_writer import get_db_writer
+            with st.expander("Backend status"):
+                st.json(router.stats())
+                st.json(router.decisions(limit=10))
+                st.json(get_db_writer().stats())
+        
         # Logout
         if st.button("Logout", use_container_width=True):
+            if st.session_state.session_token:
+                revoke_session(st.session_state.session_token)
+                st.session_state.cookie_update = ("clear", st.session_state.session_token)
+            st.session_state.session_token = None
             st.session_state.authenticated = False
             st.session_state.user_id = None
             st.session_state.username = None
+            if st.session_state.chatbot is not None:
+                st.session_state.chatbot.close()
             st.session_state.chatbot = None
             st.session_state.chat_history = []
+            st.session_state.history_cursor = None
             st.rerun()
     
     # Main content
@@ -199,6 +294,12 @@ def show_main_app():
     elif page == "Crisis Support":
         from pages.crisis_response import show_crisis_response
         show_crisis_response(lang_code)
+    elif page == "Search":
+        from pages.search import show_search
+        show_search(st.session_state.user_id)
+    elif page == "Export Data":
+        from pages.data_export import show_data_export
+        show_data_export(st.session_state.user_id)
 
 def show_chat_page(language):
     """Display chat interface"""
@@ -208,23 +309,31 @@ def show_chat_page(language):
     if st.session_state.chatbot is None:
         st.session_state.chatbot = ChatbotEngine(language)
     
-    # Chat history display
+    # Chat history display: only the newest chat_window messages are rendered
+    history = st.session_state.chat_history
+    hidden = max(len(history) - st.session_state.chat_window, 0)
+    if hidden or st.session_state.history_cursor is not None:
+        if st.button("Load older messages", use_container_width=True):
+            if not hidden:
+                rows, st.session_state.history_cursor = get_chat_history_page(
+                    st.session_state.user_id, st.session_state.history_cursor, CHAT_HISTORY_PAGE_SIZE
+                )
+                st.session_state.chat_history = turns_to_messages(rows) + history
+            st.session_state.chat_window += 2 * CHAT_HISTORY_PAGE_SIZE
+            st.rerun()
+    
     chat_container = st.container()
     
     with chat_container:
-        for message in st.session_state.chat_history:
-            if message["role"] == "user":
-                st.markdown(f"""
-                    <div class="chat-message user-message">
-                        <strong>You:</strong> {message['content']}
-                    </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown(f"""
-                    <div class="chat-message bot-message">
-                        <strong>Support Bot:</strong> {message['content']}
-                    </div>
-                """, unsafe_allow_html=True)
+        # One markdown element for the whole window instead of one per message
+        st.markdown("".join(
+            f"""
+                <div class="chat-message {'user-message' if message['role'] == 'user' else 'bot-message'}">
+                    <strong>{'You' if message['role'] == 'user' else 'Support Bot'}:</strong> {html.escape(message['content'])}
+                </div>
+            """
+            for message in history[hidden:]
+        ), unsafe_allow_html=True)
     
     # Crisis detection and response
     crisis_detector = CrisisDetector(language)
@@ -246,10 +355,25 @@ def show_chat_page(language):
                     </div>
                 """, unsafe_allow_html=True)
             
-            # Generate response
-            response = st.session_state.chatbot.generate_response(user_input)
+            st.markdown(f"""
+                <div class="chat-message user-message">
+                    <strong>You:</strong> {html.escape(user_input)}
+                </div>
+            """, unsafe_allow_html=True)
+            
+            # Stream the response into place as tokens arrive
+            response_placeholder = st.empty()
+            response = ""
+            for chunk in st.session_state.chatbot.stream_response(user_input):
+                response += chunk
+                response_placeholder.markdown(f"""
+                    <div class="chat-message bot-message">
+                        <strong>Support Bot:</strong> {html.escape(response)}
+                    </div>
+                """, unsafe_allow_html=True)
+            response = response.strip()
             
-            # Save to database
+            # Save to database once the stream completes
             save_chat_message(st.session_state.user_id, user_input, response, language)
             
             # Update session
@@ -0,0 +1,239 @@
+import importlib.util
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+from itertools import groupby, takewhile
+
+from config import (
+    ARCHIVE_DATABASE_PATH, ARCHIVE_AFTER_DAYS, ARCHIVE_CODEC, ARCHIVE_CHUNK_ROWS, ARCHIVE_SEGMENT_CACHE_SIZE
+)
+from db_pool import ConnectionPool, pool
+from view_cache import LRUCache
+
+ZSTD_AVAILABLE = importlib.util.find_spec("zstandard") is not None
+
+# Layout of every archived turn; the same columns, in the same order, as
+# the chat_history export
+ARCHIVE_COLUMNS = ["id", "message", "response", "language", "timestamp"]
+
+archive_pool = ConnectionPool(ARCHIVE_DATABASE_PATH)
+
+# Decoded segments, so paging back through one month decompresses it once
+segment_cache = LRUCache(ARCHIVE_SEGMENT_CACHE_SIZE)
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def _ensure_schema():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with archive_pool.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_archive_segments (
+                    user_id INTEGER NOT NULL,
+                    month TEXT NOT NULL,
+                    codec TEXT NOT NULL,
+                    first_id INTEGER NOT NULL,
+                    last_id INTEGER NOT NULL,
+                    turn_count INTEGER NOT NULL,
+                    raw_bytes INTEGER NOT NULL,
+                    payload BLOB NOT NULL,
+                    PRIMARY KEY (user_id, month)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_chat_archive_user_first_id
+                ON chat_archive_segments (user_id, first_id)
+            """)
+        _schema_ready = True
+
+
+def _archive_exists():
+    # Reads never create the archive; before the first archiving run there
+    # is nothing in it, so new users' history pages never open it
+    return os.path.exists(ARCHIVE_DATABASE_PATH)
+
+
+def _default_codec():
+    return "zlib" if ARCHIVE_CODEC == "zstd" and not ZSTD_AVAILABLE else ARCHIVE_CODEC
+
+
+def _compress(data, codec):
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, 9)
+    raise ValueError(f"Unknown archive codec {codec!r}")
+
+
+def _decompress(payload, codec):
+    if codec == "zstd":
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+def _decode(payload, codec):
+    return json.loads(_decompress(payload, codec))
+
+
+def _merge_segment(conn, user_id, month, rows, codec):
+    """Fold rows into a user's month segment, keyed by turn id
+
+    Merging by id makes re-archiving the same turns a no-op, so a job that
+    died between writing the archive and deleting the hot rows can simply
+    run again.
+    """
+    turns = {}
+    existing = conn.execute("""
+        SELECT codec, payload FROM chat_archive_segments WHERE user_id = ? AND month = ?
+    """, (user_id, month)).fetchone()
+    if existing:
+        for turn in _decode(existing[1], existing[0]):
+            turns[turn[0]] = turn
+    for row in rows:
+        turns[row[0]] = list(row)
+
+    ordered = [turns[turn_id] for turn_id in sorted(turns)]
+    raw = json.dumps(ordered, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    payload = _compress(raw, codec)
+    conn.execute("""
+        INSERT INTO chat_archive_segments
+            (user_id, month, codec, first_id, last_id, turn_count, raw_bytes, payload)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, month) DO UPDATE
+        SET codec = excluded.codec,
+            first_id = excluded.first_id,
+            last_id = excluded.last_id,
+            turn_count = excluded.turn_count,
+            raw_bytes = excluded.raw_bytes,
+            payload = excluded.payload
+    """, (user_id, month, codec, ordered[0][0], ordered[-1][0], len(ordered), len(raw), payload))
+
+
+def archive_chat_history(older_than_days=ARCHIVE_AFTER_DAYS, chunk_rows=ARCHIVE_CHUNK_ROWS, codec=None):
+    """Move chat turns older than the cutoff into compressed monthly segments
+
+    Scans chat_history in id order, which is also time order, and stops at
+    the first turn newer than the cutoff. Each chunk is merged into its
+    (user, month) segments and committed to the archive database before
+    the same id range is deleted from the hot database. Returns the number
+    of turns archived and segments written.
+    """
+    _ensure_schema()
+    codec = codec or _default_codec()
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+    archived = 0
+    segments = 0
+    last_id = 0
+    while True:
+        with pool.connection() as conn:
+            rows = conn.execute("""
+                SELECT id, user_id, message, response, language, timestamp FROM chat_history
+                WHERE id > ?
+                ORDER BY id
+                LIMIT ?
+            """, (last_id, chunk_rows)).fetchall()
+        old = list(takewhile(lambda row: row[5] < cutoff, rows))
+        if not old:
+            break
+
+        # Group by (user, month) rather than by scan position
+        old_by_segment = sorted(old, key=lambda row: (row[1], row[5][:7], row[0]))
+        with archive_pool.transaction() as archive_conn:
+            for (user_id, month), group in groupby(old_by_segment, key=lambda row: (row[1], row[5][:7])):
+                turns = [(row[0], row[2], row[3], row[4], row[5]) for row in group]
+                _merge_segment(archive_conn, user_id, month, turns, codec)
+                segments += 1
+        with pool.transaction() as conn:
+            conn.execute("DELETE FROM chat_history WHERE id > ? AND id <= ?", (last_id, old[-1][0]))
+
+        archived += len(old)
+        last_id = old[-1][0]
+        if len(old) < len(rows) or len(rows) < chunk_rows:
+            break
+    return {"turns": archived, "segments": segments, "cutoff": cutoff}
+
+
+def _segment_turns(user_id, month, last_id, turn_count):
+    def load():
+        with archive_pool.connection() as conn:
+            codec, payload = conn.execute("""
+                SELECT codec, payload FROM chat_archive_segments WHERE user_id = ? AND month = ?
+            """, (user_id, month)).fetchone()
+        return _decode(payload, codec)
+
+    # last_id and turn_count change whenever a merge rewrites the segment
+    return segment_cache.get_or_build((user_id, month, last_id, turn_count), load)
+
+
+def get_archived_turns(user_id, before_id=None, limit=20):
+    """Get up to limit archived turns older than before_id, newest first
+
+    Rows are (id, message, response, timestamp), like the hot history
+    page. Only segments that hold turns before before_id are decompressed,
+    newest segment first, and only until limit turns have been found.
+    """
+    if not _archive_exists():
+        return []
+    _ensure_schema()
+    before_id = before_id if before_id is not None else 2 ** 63 - 1
+    with archive_pool.connection() as conn:
+        segments = conn.execute("""
+            SELECT month, last_id, turn_count FROM chat_archive_segments
+            WHERE user_id = ? AND first_id < ?
+            ORDER BY first_id DESC
+        """, (user_id, before_id)).fetchall()
+
+    turns = []
+    for month, last_id, turn_count in segments:
+        segment = _segment_turns(user_id, month, last_id, turn_count)
+        for turn_id, message, response, _, timestamp in reversed(segment):
+            if turn_id >= before_id:
+                continue
+            turns.append((turn_id, message, response, timestamp))
+            if len(turns) >= limit:
+                return turns
+    return turns
+
+
+def iter_archived_rows(user_id):
+    """Yield a user's archived turns as ARCHIVE_COLUMNS rows, one segment at a time, oldest first"""
+    if not _archive_exists():
+        return
+    _ensure_schema()
+    with archive_pool.connection() as conn:
+        segments = conn.execute("""
+            SELECT month, last_id, turn_count FROM chat_archive_segments
+            WHERE user_id = ?
+            ORDER BY first_id
+        """, (user_id,)).fetchall()
+    for month, last_id, turn_count in segments:
+        yield [tuple(turn) for turn in _segment_turns(user_id, month, last_id, turn_count)]
+
+
+def archive_stats():
+    """Segment and turn counts and the overall compression ratio"""
+    _ensure_schema()
+    with archive_pool.connection() as conn:
+        segments, turns, raw_bytes, stored_bytes = conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(turn_count), 0), COALESCE(SUM(raw_bytes), 0),
+                   COALESCE(SUM(LENGTH(payload)), 0)
+            FROM chat_archive_segments
+        """).fetchone()
+    return {
+        "segments": segments,
+        "turns": turns,
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "ratio": raw_bytes / stored_bytes if stored_bytes else None,
+        "segment_cache": segment_cache.stats(),
+    }
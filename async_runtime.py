@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_loop():
+    """Process-wide event loop running on a daemon thread
+
+    The synchronous API (Streamlit reruns, scripts) drives coroutines on
+    this loop, so sync and async callers share one set of async clients.
+    """
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="async-runtime", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def run(coro, timeout=None):
+    """Run a coroutine on the shared loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+def iterate(agen):
+    """Iterate an async generator from synchronous code"""
+    loop = get_loop()
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+    finally:
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
+
+
+async def aiter_blocking(iterable):
+    """Iterate a blocking iterable on its own thread without blocking the loop
+
+    Items are handed over through an asyncio queue. If the consumer stops
+    early, the thread stops pulling at the next item and closes the
+    iterable itself, since a generator cannot be closed from another
+    thread while it is running.
+    """
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    stopped = threading.Event()
+    done = object()
+
+    def pump():
+        try:
+            for item in iterable:
+                if stopped.is_set():
+                    break
+                loop.call_soon_threadsafe(items.put_nowait, (item, None))
+            else:
+                loop.call_soon_threadsafe(items.put_nowait, (done, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(items.put_nowait, (done, e))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+
+    threading.Thread(target=pump, name="aiter-blocking", daemon=True).start()
+    try:
+        while True:
+            item, error = await items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stopped.set()
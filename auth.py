@@ -1,58 +1,154 @@
 import bcrypt
+import math
+import os
 import sqlite3
-from config import DATABASE_PATH
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    AUTH_HASH_WORKERS, AUTH_HASH_QUEUE_DEPTH, BCRYPT_ROUNDS,
+    BCRYPT_TARGET_MS, BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS, BCRYPT_ROUNDS_PATH
+)
+from db_pool import pool
+
+class AuthBusyError(Exception):
+    """Raised when too many password operations are already queued"""
+
+# bcrypt releases the GIL, so a small pool hashes in parallel while the
+# bound on queued work keeps a login burst from piling up without limit
+_hash_executor = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(AUTH_HASH_WORKERS + AUTH_HASH_QUEUE_DEPTH)
+_bcrypt_rounds = BCRYPT_ROUNDS or 12
+
+def _submit_password_work(fn, *args):
+    """Run CPU-heavy password work on the bounded executor"""
+    if not _hash_slots.acquire(blocking=False):
+        raise AuthBusyError("Too many sign-ins in progress, please try again shortly")
+    future = _hash_executor.submit(fn, *args)
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
+
+def _probe_bcrypt_cost(target_ms, probes=5):
+    # Each extra round doubles the work, so timing a cheap cost is enough to
+    # extrapolate; the median of a few probes ignores a one-off slow run
+    probe_rounds = 8
+    samples = []
+    for _ in range(probes):
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration", bcrypt.gensalt(probe_rounds))
+        samples.append((time.perf_counter() - started) * 1000)
+    probe_ms = max(statistics.median(samples), 0.01)
+    
+    rounds = probe_rounds + round(math.log2(target_ms / probe_ms))
+    return min(max(rounds, BCRYPT_MIN_ROUNDS), BCRYPT_MAX_ROUNDS)
+
+def _read_stored_rounds():
+    try:
+        with open(BCRYPT_ROUNDS_PATH) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+def calibrate_bcrypt_cost(target_ms=BCRYPT_TARGET_MS):
+    """Pick the bcrypt cost whose hash takes about target_ms on this machine
+    
+    The first calibration is stored in BCRYPT_ROUNDS_PATH and reused by
+    every later start and every other process, so a noisy probe cannot
+    change the cost on restart and send every user's hash for a rehash.
+    Delete the file to recalibrate, e.g. after moving to new hardware.
+    BCRYPT_ROUNDS, when set, overrides calibration.
+    """
+    global _bcrypt_rounds
+    if BCRYPT_ROUNDS:
+        _bcrypt_rounds = BCRYPT_ROUNDS
+        return _bcrypt_rounds
+    
+    rounds = _read_stored_rounds()
+    if rounds is None:
+        rounds = _probe_bcrypt_cost(target_ms)
+        os.makedirs(os.path.dirname(BCRYPT_ROUNDS_PATH) or ".", exist_ok=True)
+        try:
+            fd = os.open(BCRYPT_ROUNDS_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            # Another process calibrated first; use its cost
+            rounds = _read_stored_rounds() or rounds
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(f"{rounds}\n")
+    _bcrypt_rounds = rounds
+    return _bcrypt_rounds
+
+def get_bcrypt_rounds():
+    """Cost factor used for new password hashes"""
+    return _bcrypt_rounds
+
+def hash_rounds(hash_value):
+    """Cost factor stored in a bcrypt hash such as $2b$12$..."""
+    try:
+        return int(hash_value.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+def _verify_password(password, hash_value):
+    return bcrypt.checkpw(password.encode(), hash_value.encode())
 
 def hash_password(password):
     """Hash password using bcrypt"""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    return _submit_password_work(_hash_password, password, _bcrypt_rounds).result()
 
 def verify_password(password, hash_value):
     """Verify password against hash"""
-    return bcrypt.checkpw(password.encode(), hash_value.encode())
+    return _submit_password_work(_verify_password, password, hash_value).result()
+
+def _rehash_password(user_id, password, old_hash):
+    new_hash = _hash_password(password, _bcrypt_rounds)
+    with pool.transaction() as conn:
+        # Only replace the hash we verified, in case the password changed meanwhile
+        conn.execute(
+            "UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?",
+            (new_hash, user_id, old_hash)
+        )
 
 def create_user(username, password, email=""):
     """Create new user"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
     try:
         password_hash = hash_password(password)
-        cursor.execute("""
-            INSERT INTO users (username, password_hash, email)
-            VALUES (?, ?, ?)
-        """, (username, password_hash, email))
-        conn.commit()
-        conn.close()
+        with pool.transaction() as conn:
+            conn.execute("""
+                INSERT INTO users (username, password_hash, email)
+                VALUES (?, ?, ?)
+            """, (username, password_hash, email))
         return True
     except sqlite3.IntegrityError:
-        conn.close()
         return False
 
 def authenticate_user(username, password):
     """Authenticate user"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
-    result = cursor.fetchone()
-    conn.close()
+    with pool.connection() as conn:
+        result = conn.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,)).fetchone()
     
     if result and verify_password(password, result[1]):
+        # Upgrade hashes made with a lower cost in the background; a higher
+        # stored cost is kept, so hashes never flip back and forth
+        if (hash_rounds(result[1]) or 0) < _bcrypt_rounds:
+            try:
+                _submit_password_work(_rehash_password, result[0], password, result[1])
+            except AuthBusyError:
+                pass
         return result[0]
     return None
 
 def get_user_language(user_id):
     """Get user's preferred language"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT preferred_language FROM users WHERE id = ?", (user_id,))
-    result = cursor.fetchone()
-    conn.close()
+    with pool.connection() as conn:
+        result = conn.execute("SELECT preferred_language FROM users WHERE id = ?", (user_id,)).fetchone()
     return result[0] if result else "English"
 
 def update_user_language(user_id, language):
     """Update user's preferred language"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE users SET preferred_language = ? WHERE id = ?", (language, user_id))
-    conn.commit()
-    conn.close()
+    with pool.transaction() as conn:
+        conn.execute("UPDATE users SET preferred_language = ? WHERE id = ?", (language, user_id))
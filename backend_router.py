@@ -0,0 +1,310 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+from async_runtime import aiter_blocking, iterate
+
+from config import (
+    ROUTER_HEDGE_AFTER_MS, ROUTER_TURN_SLO_MS, ROUTER_STATS_WINDOW,
+    ROUTER_BREAKER_FAILURES, ROUTER_BREAKER_RESET_SECONDS, ROUTER_DECISION_LOG_SIZE
+)
+
+
+class BackendError(Exception):
+    """Raised by a backend stream that cannot produce a reply"""
+
+
+class BackendStats:
+    """Rolling latency and error rate over a backend's last few calls"""
+
+    def __init__(self, window=ROUTER_STATS_WINDOW):
+        self.calls = deque(maxlen=window)
+        self.total_calls = 0
+        self.total_errors = 0
+        self.hedged = 0
+        self._lock = threading.Lock()
+
+    def record(self, ok, first_chunk_seconds=None, total_seconds=None):
+        with self._lock:
+            self.calls.append((ok, first_chunk_seconds, total_seconds))
+            self.total_calls += 1
+            if not ok:
+                self.total_errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            calls = list(self.calls)
+            first = sorted(c[1] for c in calls if c[0] and c[1] is not None)
+            total = sorted(c[2] for c in calls if c[0] and c[2] is not None)
+            return {
+                "calls": self.total_calls,
+                "errors": self.total_errors,
+                "hedged": self.hedged,
+                "error_rate": sum(1 for c in calls if not c[0]) / len(calls) if calls else 0.0,
+                "p50_first_chunk_ms": _percentile(first, 0.50),
+                "p95_first_chunk_ms": _percentile(first, 0.95),
+                "p50_total_ms": _percentile(total, 0.50),
+                "p95_total_ms": _percentile(total, 0.95),
+            }
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000, 1)
+
+
+class CircuitBreaker:
+    """Stops routing to a backend after consecutive failures
+
+    After ``failures`` consecutive errors the breaker opens and the backend
+    is skipped. Once ``reset_seconds`` have passed a single trial call is
+    let through (half-open); success closes the breaker, failure reopens it.
+    """
+
+    def __init__(self, failures=ROUTER_BREAKER_FAILURES, reset_seconds=ROUTER_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failures
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def release_trial(self):
+        """End a half-open trial that was cancelled without a verdict"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._trial_running or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class _Attempt:
+    """One backend stream running as a task, feeding a shared queue"""
+
+    def __init__(self, name, stream_factory, events):
+        self.name = name
+        self.started = time.perf_counter()
+        self.first_chunk_at = None
+        self.stream = None
+        self._factory = stream_factory
+        self._events = events
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        try:
+            stream = self.stream = self._factory()
+            # Blocking backends (local model, sync HTTP) are pumped on a thread
+            if not hasattr(stream, "__aiter__"):
+                stream = aiter_blocking(stream)
+            async for chunk in stream:
+                await self._events.put((self, "chunk", chunk))
+            await self._events.put((self, "done", None))
+        except Exception as e:
+            await self._events.put((self, "error", e))
+
+    def cancel(self):
+        self.task.cancel()
+        # Cancelling the task only stops reading; a stream with cancel()
+        # (the local model) also stops the work producing it
+        if hasattr(self.stream, "cancel"):
+            self.stream.cancel()
+
+
+class BackendRouter:
+    """Routes each turn across backends in preference order
+
+    Backends run as tasks on an event loop. The first backend whose
+    circuit is closed is started. If it has not produced its first chunk
+    within the hedge budget, or fails before doing so, the next backend
+    starts alongside it and whichever streams first wins; the loser is
+    cancelled. Once a backend has streamed text
+    the turn is committed to it. By the turn SLO every backend has been
+    started, so the always-available last backend (canned replies)
+    bounds how long a user can wait for a first chunk.
+    """
+
+    def __init__(self, hedge_after_ms=ROUTER_HEDGE_AFTER_MS, turn_slo_ms=ROUTER_TURN_SLO_MS,
+                 decision_log_size=ROUTER_DECISION_LOG_SIZE):
+        self.hedge_after = hedge_after_ms / 1000
+        self.turn_slo = turn_slo_ms / 1000
+        self.backend_stats = {}
+        self.breakers = {}
+        self.decision_log = deque(maxlen=decision_log_size)
+        self._lock = threading.Lock()
+
+    def _stats(self, name):
+        with self._lock:
+            if name not in self.backend_stats:
+                self.backend_stats[name] = BackendStats()
+                self.breakers[name] = CircuitBreaker()
+            return self.backend_stats[name], self.breakers[name]
+
+    def stream(self, backends):
+        """Synchronous wrapper around astream()"""
+        return iterate(self.astream(backends))
+
+    async def astream(self, backends):
+        """Yield the reply chunks of the winning backend
+
+        backends is an ordered list of (name, stream_factory); a factory may
+        return an async or a blocking iterable. The last backend is treated
+        as always available and never skipped by its breaker.
+        """
+        pending = list(backends)
+        fallback = backends[-1][0] if backends else None
+        decision = {
+            "at": time.time(), "skipped": [], "started": [],
+            "winner": None, "hedged": False, "first_chunk_ms": None, "errors": {}
+        }
+        events = asyncio.Queue()
+        running = []
+        finished = set()
+        turn_started = time.perf_counter()
+
+        def start_next(hedge=False):
+            # Breakers are consulted only when a backend is actually needed
+            while pending:
+                name, factory = pending.pop(0)
+                if pending and not self._stats(name)[1].allow():
+                    decision["skipped"].append(name)
+                    continue
+                if hedge:
+                    decision["hedged"] = True
+                    for attempt in running:
+                        self._stats(attempt.name)[0].hedged += 1
+                running.append(_Attempt(name, factory, events))
+                decision["started"].append(name)
+                return
+
+        start_next()
+        winner = None
+        try:
+            # Race for the first chunk, starting further backends as budgets expire
+            while winner is None:
+                elapsed = time.perf_counter() - turn_started
+                if pending:
+                    deadline = min(self.hedge_after * len(decision["started"]), self.turn_slo)
+                    timeout = max(deadline - elapsed, 0)
+                else:
+                    timeout = None
+                try:
+                    attempt, kind, payload = await asyncio.wait_for(events.get(), timeout)
+                except asyncio.TimeoutError:
+                    start_next(hedge=True)
+                    continue
+                if kind == "chunk":
+                    winner = attempt
+                    attempt.first_chunk_at = time.perf_counter()
+                    decision["winner"] = attempt.name
+                    decision["first_chunk_ms"] = round((attempt.first_chunk_at - turn_started) * 1000, 1)
+                    for other in running:
+                        if other is not attempt:
+                            other.cancel()
+                    yield payload
+                else:
+                    # Failed, or finished without producing any text
+                    self._finish(attempt, ok=False)
+                    finished.add(attempt)
+                    decision["errors"][attempt.name] = str(payload) if kind == "error" else "empty reply"
+                    running.remove(attempt)
+                    if pending:
+                        start_next()
+                    if not running:
+                        raise payload if kind == "error" else BackendError("No backend produced a reply")
+
+            # Committed: relay the winner until it finishes
+            while True:
+                attempt, kind, payload = await events.get()
+                if attempt is not winner:
+                    continue
+                if kind == "chunk":
+                    yield payload
+                    continue
+                finished.add(winner)
+                if kind == "done":
+                    self._finish(winner, ok=True)
+                    return
+                decision["errors"][winner.name] = str(payload)
+                self._finish(winner, ok=False)
+                raise payload
+        finally:
+            for attempt in running:
+                attempt.cancel()
+                if attempt in finished:
+                    continue
+                # Losers started before the winner missed their latency budget.
+                # Losing to the canned fallback only means the turn SLO ran
+                # out; counting that would open a slow (e.g. CPU-only) local
+                # model's breaker and switch it off altogether.
+                missed_budget = (
+                    winner is not None and attempt is not winner and attempt.started < winner.started
+                    and winner.name != fallback
+                )
+                self._abandon(attempt, missed_budget)
+            self.decision_log.append(decision)
+
+    def _finish(self, attempt, ok):
+        stats, breaker = self._stats(attempt.name)
+        now = time.perf_counter()
+        if ok:
+            breaker.record_success()
+            stats.record(True, attempt.first_chunk_at - attempt.started, now - attempt.started)
+        else:
+            breaker.record_failure()
+            stats.record(False)
+
+    def _abandon(self, attempt, missed_budget):
+        stats, breaker = self._stats(attempt.name)
+        if missed_budget:
+            # Repeatedly blowing the latency budget trips the breaker like errors do
+            breaker.record_failure()
+            stats.record(False)
+        else:
+            breaker.release_trial()
+
+    def stats(self):
+        """Per-backend rolling stats and breaker state"""
+        with self._lock:
+            names = list(self.backend_stats)
+        return {
+            name: {**self.backend_stats[name].snapshot(), "breaker": self.breakers[name].state}
+            for name in names
+        }
+
+    def decisions(self, limit=20):
+        """Most recent routing decisions, newest first"""
+        return list(self.decision_log)[-limit:][::-1]
+
+
+# Shared by every session so stats and breakers reflect all traffic
+router = BackendRouter()
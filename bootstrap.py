@@ -0,0 +1,49 @@
+import sys
+import threading
+import time
+
+from alert_queue import get_alert_queue
+from auth import calibrate_bcrypt_cost
+from database import init_database
+import import_profiler
+from session_tokens import purge_expired_sessions
+from therapy_modules import get_catalog
+
+_lock = threading.Lock()
+_done = False
+startup_seconds = None
+
+
+def bootstrap():
+    """Run process-wide one-time setup; later calls return immediately
+
+    Streamlit re-executes app.py on every interaction, but imported modules
+    persist for the life of the server process, so this flag does too.
+    """
+    global _done, startup_seconds
+    if _done:
+        return False
+    with _lock:
+        if _done:
+            return False
+        started = time.perf_counter()
+
+        # Schema migrations (DDL) run once per process, not on every rerun
+        init_database()
+        purge_expired_sessions()
+
+        # Match the bcrypt cost to this machine's speed
+        calibrate_bcrypt_cost()
+
+        # Parse therapy content once; a malformed catalog fails at startup
+        get_catalog()
+
+        # Start the crisis alert writer, replaying alerts left by a previous run
+        get_alert_queue()
+
+        startup_seconds = time.perf_counter() - started
+        if import_profiler.PROFILE_IMPORTS:
+            import_profiler.profiler.report(file=sys.stderr)
+            print(f"Bootstrap: {startup_seconds * 1000:.1f} ms", file=sys.stderr)
+        _done = True
+        return True
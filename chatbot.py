@@ -1,41 +1,139 @@
+import importlib.util
+import json
 import os
+import re
 from dotenv import load_dotenv
+from config import (
+    API_BASE_URL, API_MODEL, API_MAX_TOKENS, MODEL_NAME, MODEL_DTYPE, MODEL_DEVICE,
+    MODEL_QUANTIZATION, TORCH_NUM_THREADS, LOCAL_MAX_NEW_TOKENS, INFERENCE_MAX_BATCH_SIZE,
+    INFERENCE_MAX_WAIT_MS, MODEL_CONTEXT_TOKENS, DEFAULT_CONTEXT_TOKENS, CONTEXT_PINNED_MESSAGES,
+    DRAFT_MODEL_NAME, DRAFT_MIN_ACCEPTANCE, DRAFT_WARMUP_TOKENS, INFERENCE_PREFIX_CACHE_SIZE
+)
+from model_registry import registry, TRANSFORMERS_AVAILABLE
+from inference_server import DecodingStats, get_worker
+from context_window import ContextWindow
+from backend_router import BackendError, router
+from async_runtime import iterate
 
 load_dotenv()
 
-# Try to import from transformers library for local model support
-try:
-    from transformers import AutoTokenizer, AutoModelForCausalLM
-    TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
+# httpx is optional; without it the API backend runs the requests path on a thread
+HTTPX_AVAILABLE = importlib.util.find_spec("httpx") is not None
+
+
+_SSE_DONE = object()
+
+
+def _sse_content(line):
+    """Content delta of one server-sent event line, _SSE_DONE at the end"""
+    if not line or not line.startswith("data:"):
+        return None
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return _SSE_DONE
+    return json.loads(data)["choices"][0].get("delta", {}).get("content") or None
+
+
+def _iter_sse_content(lines):
+    """Yield content deltas from an OpenAI-style server-sent event stream"""
+    for line in lines:
+        content = _sse_content(line)
+        if content is _SSE_DONE:
+            break
+        if content:
+            yield content
+
+
+async def _aiter_sse_content(lines):
+    """Async counterpart of _iter_sse_content"""
+    async for line in lines:
+        content = _sse_content(line)
+        if content is _SSE_DONE:
+            break
+        if content:
+            yield content
+
+
+def _stop_at(chunks, stop):
+    """Pass chunks through until the stop sequence, which is not emitted"""
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        if stop in pending:
+            yield pending.split(stop)[0]
+            return
+        # Hold back a tail that could be the start of the stop sequence
+        safe = len(pending) - len(stop) + 1
+        if safe > 0:
+            yield pending[:safe]
+            pending = pending[safe:]
+    if pending:
+        yield pending
+
+
+class _LocalStream:
+    """Reply chunks of a local InferenceRequest
+
+    The router calls cancel() when another backend wins, so the shared
+    worker stops generating for this turn instead of finishing it unread.
+    """
+
+    def __init__(self, request, stop):
+        self.request = request
+        self._chunks = self._iter(stop)
+
+    def _iter(self, stop):
+        try:
+            yield from _stop_at(self.request, stop)
+        finally:
+            # Past the stop sequence, or abandoned: the rest is not needed
+            self.request.cancel()
+
+    def __iter__(self):
+        return self._chunks
+
+    def close(self):
+        self._chunks.close()
+
+    def cancel(self):
+        self.request.cancel()
+
 
 class ChatbotEngine:
     """Main chatbot engine supporting multiple languages"""
     
     def __init__(self, language="en"):
+        # Only conversation state is per session; weights come from the registry
         self.language = language
         self.conversation_history = []
         self.model = None
         self.tokenizer = None
+        self._loaded_model = None
+        self._draft_model = None
+        self.decoding_stats = DecodingStats(DRAFT_MIN_ACCEPTANCE, DRAFT_WARMUP_TOKENS)
         self.api_key = os.getenv("API_KEY")
         
         # Initialize model if transformers available
         if TRANSFORMERS_AVAILABLE and not self.api_key:
             self._initialize_local_model()
+        
+        # Token budget for what is sent each turn; real tokenizer when loaded
+        context_model = API_MODEL if self.api_key else MODEL_NAME
+        self.context = ContextWindow(
+            MODEL_CONTEXT_TOKENS.get(context_model, DEFAULT_CONTEXT_TOKENS),
+            reply_tokens=API_MAX_TOKENS if self.api_key else LOCAL_MAX_NEW_TOKENS,
+            pinned_messages=CONTEXT_PINNED_MESSAGES,
+            tokenizer=self.tokenizer
+        )
     
     def _initialize_local_model(self):
-        """Initialize local Mistral model if available"""
-        try:
-            model_name = "mistralai/Mistral-7B-Instruct-v0.1"
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_name,
-                device_map="auto",
-                torch_dtype="auto"
-            )
-        except Exception as e:
-            print(f"Could not load local model: {e}")
+        """Attach the process-wide shared local model if available"""
+        self._loaded_model = registry.get(MODEL_NAME, MODEL_DTYPE, MODEL_DEVICE, MODEL_QUANTIZATION)
+        if self._loaded_model:
+            self.tokenizer = self._loaded_model.tokenizer
+            self.model = self._loaded_model.model
+            if DRAFT_MODEL_NAME:
+                self._draft_model = registry.get(DRAFT_MODEL_NAME, MODEL_DTYPE, MODEL_DEVICE, MODEL_QUANTIZATION)
     
     def get_system_prompt(self):
         """Get language-specific system prompt"""
@@ -72,66 +170,156 @@ Always respond with care and respect.""",
     
     def generate_response(self, user_message):
         """Generate chatbot response"""
+        return "".join(self.stream_response(user_message))
+    
+    def stream_response(self, user_message):
+        """Generate chatbot response, yielding text chunks as they arrive"""
+        return iterate(self.astream_response(user_message))
+    
+    async def agenerate_response(self, user_message):
+        """Generate chatbot response without blocking the event loop"""
+        return "".join([chunk async for chunk in self.astream_response(user_message)])
+    
+    async def astream_response(self, user_message):
+        """Async generator of response text chunks as they arrive"""
         self.conversation_history.append({"role": "user", "content": user_message})
         
+        chunks = []
         try:
-            # Use API if available
+            system_prompt = self.get_system_prompt()
+            messages = self.context.build(system_prompt, self.conversation_history)
+            
+            # Preference order; the router hedges down the list when a
+            # backend is slow, failing or has its circuit open
+            backends = []
             if self.api_key:
-                response = self._generate_api_response(user_message)
-            # Use local model if available
-            elif self.model and self.tokenizer:
-                response = self._generate_local_response(user_message)
-            else:
-                response = self._generate_fallback_response(user_message)
+                if HTTPX_AVAILABLE:
+                    backends.append(("api", lambda: self._astream_api_response(messages)))
+                else:
+                    backends.append(("api", lambda: self._stream_api_response(messages)))
+            if self.model and self.tokenizer:
+                backends.append(("local", lambda: self._stream_local_response(system_prompt, messages)))
+            backends.append(("fallback", lambda: self._astream_fallback_response(user_message)))
+            
+            async for chunk in router.astream(backends):
+                chunks.append(chunk)
+                yield chunk
             
-            self.conversation_history.append({"role": "assistant", "content": response})
-            return response
+            self.conversation_history.append({"role": "assistant", "content": "".join(chunks).strip()})
         except Exception as e:
-            return f"I encountered an error generating a response. Please try again. Error: {str(e)}"
+            yield f"I encountered an error generating a response. Please try again. Error: {str(e)}"
     
-    def _generate_api_response(self, user_message):
-        """Generate response using API (e.g., OpenAI, Anthropic)"""
-        import requests
-        
+    def _api_request(self, messages):
         headers = {"Authorization": f"Bearer {self.api_key}"}
-        messages = [{"role": "system", "content": self.get_system_prompt()}]
-        messages.extend(self.conversation_history)
-        
         payload = {
-            "model": "gpt-3.5-turbo",
+            "model": API_MODEL,
             "messages": messages,
             "temperature": 0.7,
-            "max_tokens": 500
+            "max_tokens": API_MAX_TOKENS,
+            "stream": True
         }
+        return f"{API_BASE_URL}/chat/completions", payload, headers
+    
+    async def _astream_api_response(self, messages):
+        """Stream response from the API on the event loop with httpx"""
+        from http_client import apost_json_stream
         
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
+        url, payload, headers = self._api_request(messages)
+        async with apost_json_stream(url, payload, headers=headers) as response:
+            if response.status_code != 200:
+                raise BackendError(f"API returned HTTP {response.status_code}")
+            
+            async for chunk in _aiter_sse_content(response.aiter_lines()):
+                yield chunk
+    
+    def _stream_api_response(self, messages):
+        """Stream response from API (e.g., OpenAI, Anthropic) via server-sent events"""
+        from http_client import post_json
         
-        if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
-        else:
-            return self._generate_fallback_response(user_message)
+        url, payload, headers = self._api_request(messages)
+        
+        # Pooled keep-alive connection; retries 429/5xx with backoff
+        with post_json(url, payload, headers=headers, stream=True) as response:
+            if response.status_code != 200:
+                raise BackendError(f"API returned HTTP {response.status_code}")
+            
+            yield from _iter_sse_content(response.iter_lines(decode_unicode=True))
     
-    def _generate_local_response(self, user_message):
-        """Generate response using local model"""
-        system_prompt = self.get_system_prompt()
-        prompt = f"{system_prompt}\n\nUser: {user_message}\n\nAssistant:"
+    def _stream_local_response(self, system_prompt, messages):
+        """Stream response from local model; the stream can be cancelled"""
+        prompt = self._build_local_prompt(messages)
+        
+        # Shared worker batches this prompt with other sessions' prompts
+        worker = get_worker(
+            self._loaded_model, INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS, TORCH_NUM_THREADS,
+            draft_model=self._draft_model, prefix_cache_size=INFERENCE_PREFIX_CACHE_SIZE
+        )
         
-        inputs = self.tokenizer(prompt, return_tensors="pt")
-        outputs = self.model.generate(
-            **inputs,
-            max_length=500,
+        input_ids, prefix_ids = self._split_prefix(prompt, system_prompt)
+        request = worker.submit(
+            input_ids,
+            max_new_tokens=LOCAL_MAX_NEW_TOKENS,
             temperature=0.7,
             top_p=0.9,
-            do_sample=True
+            prefix_ids=prefix_ids,
+            session_stats=self.decoding_stats
         )
+        return _LocalStream(request, "User:")
+    
+    def _build_local_prompt(self, messages):
+        """Render managed history with the tokenizer's chat template"""
+        system = messages[0]["content"]
+        turns = [dict(message) for message in messages[1:]]
+        
+        # Templates like Mistral's only accept alternating turns starting
+        # with the user, so the system prompt leads the first user turn
+        while turns and turns[0]["role"] != "user":
+            system += f"\n\nAssistant: {turns.pop(0)['content']}"
+        if turns:
+            turns[0]["content"] = f"{system}\n\n{turns[0]['content']}"
+        else:
+            turns = [{"role": "user", "content": system}]
+        
+        try:
+            return self.tokenizer.apply_chat_template(turns, tokenize=False, add_generation_prompt=True)
+        except Exception:
+            lines = [
+                f"{'User' if turn['role'] == 'user' else 'Assistant'}: {turn['content']}"
+                for turn in turns
+            ]
+            return "\n\n".join(lines) + "\n\nAssistant:"
+    
+    def _split_prefix(self, prompt, system_prompt):
+        """Token ids of the prompt and of its shared system-prompt prefix
         
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return response.split("Assistant:")[-1].strip()
+        Everything up to the end of the system prompt is identical for all
+        sessions in a language, so its key/value cache can be reused. The
+        prompt is encoded once as a whole, so the model sees exactly the
+        template's tokens, and the prefix is only offered to the cache when
+        those ids really start with it. Returns (input_ids, prefix_ids),
+        with prefix_ids None when there is no shared prefix.
+        """
+        input_ids = self._encode(prompt)
+        start = prompt.find(system_prompt)
+        if start == -1:
+            # The template rewrote the system text; nothing stable to share
+            return input_ids, None
+        prefix_ids = self._encode(prompt[:start + len(system_prompt)])
+        # The last token may merge with the text after it; the rest still matches
+        for candidate in (prefix_ids, prefix_ids[:-1]):
+            if candidate and input_ids[:len(candidate)] == candidate:
+                return input_ids, candidate
+        return input_ids, None
+    
+    def _encode(self, text):
+        # Special tokens are already spelled out by the chat template
+        return self.tokenizer(text, add_special_tokens=False)["input_ids"]
+    
+    async def _astream_fallback_response(self, user_message):
+        """Stream fallback response word by word"""
+        response = self._generate_fallback_response(user_message)
+        for word in re.findall(r"\S+\s*", response):
+            yield word
     
     def _generate_fallback_response(self, user_message):
         """Generate fallback response when no AI available"""
@@ -153,11 +341,27 @@ Always respond with care and respect.""",
         import random
         return random.choice(responses)
     
+    def seed_history(self, messages):
+        """Start from earlier turns, e.g. chat history restored on login"""
+        self.conversation_history = [dict(message) for message in messages]
+        self.context.reset()
+    
     def clear_history(self):
         """Clear conversation history"""
         self.conversation_history = []
+        self.context.reset()
     
     def change_language(self, language_code):
         """Change chatbot language"""
         self.language = language_code
         self.clear_history()
+    
+    def close(self):
+        """Detach this session from the shared local model"""
+        registry.release(self._loaded_model)
+        registry.release(self._draft_model)
+        self._loaded_model = None
+        self._draft_model = None
+        self.model = None
+        self.tokenizer = None
+        self.context.tokenizer = None
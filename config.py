@@ -5,10 +5,109 @@ load_dotenv()
 
 # Database
 DATABASE_PATH = os.getenv("DATABASE_PATH", "data/mental_health_chatbot.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KIB = int(os.getenv("DB_CACHE_SIZE_KIB", "16384"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "128"))
+# Chat and mood writes are buffered and group-committed: one transaction per
+# WRITE_BATCH_ROWS rows or WRITE_BATCH_WAIT_MS after the first queued row
+WRITE_BATCH_ROWS = int(os.getenv("WRITE_BATCH_ROWS", "100"))
+WRITE_BATCH_WAIT_MS = float(os.getenv("WRITE_BATCH_WAIT_MS", "5"))
+# Recent commits kept for the writer's batch size and lag stats
+WRITE_LAG_WINDOW = int(os.getenv("WRITE_LAG_WINDOW", "1000"))
+
+# Cold storage for old chat turns: per-user monthly compressed segments in a
+# separate database, read only when a user pages back past the hot history
+ARCHIVE_DATABASE_PATH = os.getenv("ARCHIVE_DATABASE_PATH", "data/chat_archive.db")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+# "zstd" needs the zstandard package and falls back to "zlib" without it
+ARCHIVE_CODEC = os.getenv("ARCHIVE_CODEC", "zstd")
+ARCHIVE_CHUNK_ROWS = int(os.getenv("ARCHIVE_CHUNK_ROWS", "2000"))
+ARCHIVE_SEGMENT_CACHE_SIZE = int(os.getenv("ARCHIVE_SEGMENT_CACHE_SIZE", "64"))
+
+# Full-text search over chat turns and mood notes
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "10"))
+SEARCH_SNIPPET_TOKENS = int(os.getenv("SEARCH_SNIPPET_TOKENS", "16"))
+
+# Password hashing
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "4"))
+AUTH_HASH_QUEUE_DEPTH = int(os.getenv("AUTH_HASH_QUEUE_DEPTH", "32"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "0"))
+BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "12"))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "16"))
+# The calibrated cost is kept here so restarts and other processes reuse it
+BCRYPT_ROUNDS_PATH = os.getenv("BCRYPT_ROUNDS_PATH", "data/bcrypt_rounds")
+
+# Session tokens (the secret is generated into SESSION_SECRET_PATH when unset)
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+SESSION_SECRET_PATH = os.getenv("SESSION_SECRET_PATH", "data/session_secret")
+SESSION_TTL_HOURS = float(os.getenv("SESSION_TTL_HOURS", "24"))
 
 # AI Model Configuration
 MODEL_NAME = os.getenv("MODEL_NAME", "mistralai/Mistral-7B-Instruct-v0.1")
+MODEL_DTYPE = os.getenv("MODEL_DTYPE", "auto")
+MODEL_DEVICE = os.getenv("MODEL_DEVICE", "auto")
+# "int8" serves the local model with dynamically quantized linear layers on CPU
+MODEL_QUANTIZATION = os.getenv("MODEL_QUANTIZATION", "none")
+# CPU thread counts for local inference; 0 keeps torch's default
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))
+TORCH_INTEROP_THREADS = int(os.getenv("TORCH_INTEROP_THREADS", "0"))
+LOCAL_MAX_NEW_TOKENS = int(os.getenv("LOCAL_MAX_NEW_TOKENS", "256"))
+# Optional small model with the same tokenizer that drafts tokens for the local model
+DRAFT_MODEL_NAME = os.getenv("DRAFT_MODEL_NAME", "")
+# A session falls back to plain decoding once fewer than this share of draft
+# tokens are accepted, judged after DRAFT_WARMUP_TOKENS proposals
+DRAFT_MIN_ACCEPTANCE = float(os.getenv("DRAFT_MIN_ACCEPTANCE", "0.5"))
+DRAFT_WARMUP_TOKENS = int(os.getenv("DRAFT_WARMUP_TOKENS", "64"))
+
+# Context window: total tokens (prompt + reply) each model accepts
+MODEL_CONTEXT_TOKENS = {
+    "gpt-3.5-turbo": 4096,
+    "mistralai/Mistral-7B-Instruct-v0.1": 8192
+}
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("DEFAULT_CONTEXT_TOKENS", "4096"))
+CONTEXT_PINNED_MESSAGES = int(os.getenv("CONTEXT_PINNED_MESSAGES", "4"))
+
+# Chat page: turns restored on login / per "load older" click, messages rendered
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "20"))
+CHAT_RENDER_WINDOW = int(os.getenv("CHAT_RENDER_WINDOW", "40"))
+
+# Mood page: cached DataFrames and figures across all sessions
+MOOD_VIEW_CACHE_SIZE = int(os.getenv("MOOD_VIEW_CACHE_SIZE", "256"))
+
+# Data export: rows read per query
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "500"))
+
+# Local inference worker batching
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+INFERENCE_MAX_WAIT_MS = int(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+INFERENCE_PREFIX_CACHE_SIZE = int(os.getenv("INFERENCE_PREFIX_CACHE_SIZE", "8"))
 API_KEY = os.getenv("API_KEY", "")
+API_MODEL = os.getenv("API_MODEL", "gpt-3.5-turbo")
+API_MAX_TOKENS = int(os.getenv("API_MAX_TOKENS", "500"))
+API_BASE_URL = os.getenv("API_BASE_URL", "https://api.openai.com/v1")
+
+# Chat-completions HTTP client
+API_POOL_CONNECTIONS = int(os.getenv("API_POOL_CONNECTIONS", "4"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "16"))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "30"))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+API_RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "0.5"))
+# Async client: concurrent connections per event loop (one per in-flight turn)
+API_ASYNC_MAX_CONNECTIONS = int(os.getenv("API_ASYNC_MAX_CONNECTIONS", "512"))
+
+# Backend routing: per-backend budget for the first chunk before hedging to
+# the next backend, overall first-chunk SLO, rolling stats and circuit breaker
+ROUTER_HEDGE_AFTER_MS = float(os.getenv("ROUTER_HEDGE_AFTER_MS", "4000"))
+ROUTER_TURN_SLO_MS = float(os.getenv("ROUTER_TURN_SLO_MS", "8000"))
+ROUTER_STATS_WINDOW = int(os.getenv("ROUTER_STATS_WINDOW", "100"))
+ROUTER_BREAKER_FAILURES = int(os.getenv("ROUTER_BREAKER_FAILURES", "5"))
+ROUTER_BREAKER_RESET_SECONDS = float(os.getenv("ROUTER_BREAKER_RESET_SECONDS", "30"))
+ROUTER_DECISION_LOG_SIZE = int(os.getenv("ROUTER_DECISION_LOG_SIZE", "200"))
+ROUTER_DEBUG = os.getenv("ROUTER_DEBUG", "") not in ("", "0", "false")
 
 # Languages
 SUPPORTED_LANGUAGES = {
@@ -21,9 +120,14 @@ SUPPORTED_LANGUAGES = {
 CRISIS_KEYWORDS = {
     "en": ["suicide", "kill myself", "harm myself", "die", "overdose", "cut myself"],
     "hi": ["आत्महत्या", "खुद को मार", "खुद को नुकसान", "मरना", "ओवरडोज"],
-    "mr": ["आत्महत्या", "स्वत:ला मारणे", "स्वत:ला हानी", "मरणे"]
+    "mr": ["आत्महत्या", "स्वतःला मारणे", "स्वतःला हानी", "मरणे"]
 }
 
+# Crisis alert pipeline
+CRISIS_ALERT_WAL_PATH = os.getenv("CRISIS_ALERT_WAL_PATH", "data/crisis_alerts.wal")
+CRISIS_ALERT_BATCH_SIZE = int(os.getenv("CRISIS_ALERT_BATCH_SIZE", "50"))
+CRISIS_ALERT_WEBHOOK_URL = os.getenv("CRISIS_ALERT_WEBHOOK_URL", "")
+
 # Emergency Contacts
 EMERGENCY_CONTACTS = {
     "en": {
@@ -40,7 +144,11 @@ EMERGENCY_CONTACTS = {
     }
 }
 
-# Therapy Modules
+# Therapy Modules (content lives in the versioned catalog file)
+THERAPY_CATALOG_PATH = os.getenv(
+    "THERAPY_CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "content", "therapy_catalog.json")
+)
 THERAPY_MODULES = {
     "anger_management": {
         "name": "Anger Management",
@@ -0,0 +1,111 @@
+import math
+
+# Rough per-message overhead of chat formats (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text):
+    """Fast token estimate when no tokenizer is loaded
+
+    Latin text averages about four characters per token; Devanagari and
+    other non-ASCII scripts are split far more finely, so each such
+    character is counted as a token.
+    """
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+class ContextWindow:
+    """Keeps the messages sent per request inside a model's token budget
+
+    The system prompt and the most recent ``pinned_messages`` are always
+    sent. Older messages are evicted oldest first once the budget is
+    exceeded and folded into a short running summary that rides along
+    with the system prompt.
+    """
+
+    def __init__(self, budget, reply_tokens=500, pinned_messages=4, tokenizer=None):
+        self.budget = budget
+        self.reply_tokens = reply_tokens
+        self.pinned_messages = pinned_messages
+        self.tokenizer = tokenizer
+        self.summary = []
+        self.max_summary_lines = 12
+        self.last_request_tokens = 0
+        self.total_tokens_sent = 0
+        self.requests = 0
+        self.evicted_messages = 0
+
+    def count_tokens(self, text):
+        """Count tokens with the real tokenizer if loaded, else estimate"""
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return estimate_tokens(text)
+
+    def _message_tokens(self, message):
+        return self.count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+    def _system_message(self, system_prompt):
+        if not self.summary:
+            return {"role": "system", "content": system_prompt}
+        summary = "\n".join(f"- {line}" for line in self.summary)
+        return {
+            "role": "system",
+            "content": f"{system_prompt}\n\nSummary of earlier conversation:\n{summary}"
+        }
+
+    def _summarise(self, message):
+        # First sentence of each evicted turn, capped, keeps the gist cheaply
+        first_sentence = message["content"].strip().split("\n")[0]
+        for terminator in (". ", "? ", "! ", "। "):
+            first_sentence = first_sentence.split(terminator)[0]
+        if len(first_sentence) > 120:
+            first_sentence = first_sentence[:117] + "..."
+        speaker = "User" if message["role"] == "user" else "Assistant"
+        self.summary.append(f"{speaker}: {first_sentence}")
+
+    def build(self, system_prompt, history):
+        """Return the messages to send, evicting old turns from ``history``
+
+        Evicted messages are removed from ``history`` in place so the
+        session's stored conversation stays bounded too.
+        """
+        available = self.budget - self.reply_tokens
+        history_tokens = [self._message_tokens(message) for message in history]
+
+        def total():
+            system_tokens = self._message_tokens(self._system_message(system_prompt))
+            return system_tokens + sum(history_tokens)
+
+        evict = 0
+        while total() > available and len(history) - evict > self.pinned_messages:
+            self._summarise(history[evict])
+            history_tokens[evict] = 0
+            evict += 1
+        del history[:evict]
+        del history_tokens[:evict]
+
+        # The summary itself must not crowd out recent turns
+        del self.summary[:-self.max_summary_lines]
+        while self.summary and total() > available:
+            self.summary.pop(0)
+        self.evicted_messages += evict
+
+        messages = [self._system_message(system_prompt)] + list(history)
+        self.last_request_tokens = total()
+        self.total_tokens_sent += self.last_request_tokens
+        self.requests += 1
+        return messages
+
+    def reset(self):
+        self.summary = []
+
+    def stats(self):
+        return {
+            "budget": self.budget,
+            "last_request_tokens": self.last_request_tokens,
+            "average_request_tokens": self.total_tokens_sent / self.requests if self.requests else 0.0,
+            "requests": self.requests,
+            "evicted_messages": self.evicted_messages,
+            "summary_lines": len(self.summary),
+        }
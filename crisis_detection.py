@@ -1,22 +1,24 @@
+import asyncio
 from config import CRISIS_KEYWORDS, EMERGENCY_CONTACTS
-from database import log_crisis_alert
+from alert_queue import get_alert_queue
+from keyword_matcher import KeywordMatcher
+
+# Compiled once per process from every language's keywords
+_crisis_matcher = KeywordMatcher(CRISIS_KEYWORDS)
 
 class CrisisDetector:
     """Detect and respond to crisis indicators"""
     
     def __init__(self, language="en"):
         self.language = language
-        self.keywords = CRISIS_KEYWORDS.get(language, CRISIS_KEYWORDS["en"])
     
     def detect_crisis(self, message):
-        """Detect crisis indicators in message"""
-        message_lower = message.lower()
-        
-        for keyword in self.keywords:
-            if keyword.lower() in message_lower:
-                return True
-        
-        return False
+        """Detect crisis indicators in message, in any supported language"""
+        return _crisis_matcher.search(message)
+    
+    def find_crisis_keywords(self, message):
+        """Return the matched keywords with their spans in the message"""
+        return _crisis_matcher.find_all(message)
     
     def get_emergency_response(self):
         """Get crisis response with emergency contacts"""
@@ -34,5 +36,13 @@ class CrisisDetector:
         }
     
     def log_alert(self, user_id, message):
-        """Log crisis alert to database"""
-        log_crisis_alert(user_id, message)
+        """Queue crisis alert for durable, asynchronous delivery"""
+        get_alert_queue().enqueue(user_id, message)
+    
+    async def adetect_crisis(self, message):
+        """Async counterpart of detect_crisis; matching is CPU-only and fast"""
+        return self.detect_crisis(message)
+    
+    async def alog_alert(self, user_id, message):
+        """Queue crisis alert without blocking the event loop on the WAL write"""
+        await asyncio.to_thread(self.log_alert, user_id, message)
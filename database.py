@@ -1,169 +1,222 @@
-import sqlite3
+import asyncio
 from datetime import datetime
-from config import DATABASE_PATH
-import os
+from db_pool import pool
+from db_writer import get_db_writer, wait_for_user_writes
+from migrations import run_migrations
 
 def init_database():
-    """Initialize database with required tables"""
-    os.makedirs(os.path.dirname(DATABASE_PATH) or ".", exist_ok=True)
-    
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Users table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            email TEXT UNIQUE,
-            preferred_language TEXT DEFAULT 'English',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    
-    # Chat history table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS chat_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            message TEXT NOT NULL,
-            response TEXT NOT NULL,
-            language TEXT DEFAULT 'en',
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    
-    # Mood tracking table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS mood_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            mood TEXT NOT NULL,
-            intensity INTEGER CHECK(intensity >= 1 AND intensity <= 10),
-            notes TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    
-    # Crisis alerts table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS crisis_alerts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            trigger_message TEXT,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    
-    # Therapy progress table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS therapy_progress (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            module_name TEXT NOT NULL,
-            completion_percentage INTEGER DEFAULT 0,
-            last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    
-    conn.commit()
-    conn.close()
+    """Initialize database with required tables and apply pending migrations"""
+    with pool.connection() as conn:
+        run_migrations(conn)
 
 def get_user_id(username):
     """Get user ID by username"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-    result = cursor.fetchone()
-    conn.close()
+    with pool.connection() as conn:
+        result = conn.execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
     return result[0] if result else None
 
-def save_chat_message(user_id, message, response, language="en"):
-    """Save chat message and response"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
+def _insert_chat_message(conn, user_id, message, response, language):
+    conn.execute("""
         INSERT INTO chat_history (user_id, message, response, language)
         VALUES (?, ?, ?, ?)
     """, (user_id, message, response, language))
-    conn.commit()
-    conn.close()
 
-def save_mood_log(user_id, mood, intensity, notes=""):
-    """Save mood log"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
+def save_chat_message(user_id, message, response, language="en"):
+    """Save chat message and response
+    
+    Write-behind: the row is queued for the next group commit and a Future
+    is returned at once. Reads of this user's data wait for it first.
+    """
+    return get_db_writer().submit(_insert_chat_message, user_id, message, response, language, user_id=user_id)
+
+def get_chat_history_page(user_id, before_id=None, limit=20):
+    """Get up to limit chat turns older than before_id, oldest first
+    
+    Pages with a (user_id, id) keyset cursor instead of OFFSET, so every
+    page costs the same however far back it is. Pages past the hot history
+    continue into the compressed archive. Returns (rows, cursor):
+    rows are (id, message, response, timestamp) and cursor is the before_id
+    for the next older page, or None when there is nothing older.
+    """
+    wait_for_user_writes(user_id)
+    with pool.connection() as conn:
+        rows = conn.execute("""
+            SELECT id, message, response, timestamp FROM chat_history
+            WHERE user_id = ? AND id < ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (user_id, before_id if before_id is not None else 2 ** 63 - 1, limit + 1)).fetchall()
+    if len(rows) <= limit:
+        # Hot history is exhausted; older turns may have been archived, and
+        # every archived turn is older than every hot one. This costs one
+        # indexed lookup for users without segments, and nothing at all
+        # until the archive database exists.
+        from archive import get_archived_turns
+        rows += get_archived_turns(user_id, rows[-1][0] if rows else before_id, limit + 1 - len(rows))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return rows, (rows[0][0] if has_more else None)
+
+def _insert_mood_log(conn, user_id, mood, intensity, notes):
+    cursor = conn.execute("""
         INSERT INTO mood_logs (user_id, mood, intensity, notes)
         VALUES (?, ?, ?, ?)
     """, (user_id, mood, intensity, notes))
-    conn.commit()
-    conn.close()
+    # Day comes from the stored timestamp so the two can never disagree
+    conn.execute("""
+        INSERT INTO mood_daily_rollup
+            (user_id, day, mood, entry_count, intensity_sum, intensity_min, intensity_max)
+        SELECT user_id, date(timestamp), mood, 1, intensity, intensity, intensity
+        FROM mood_logs WHERE id = ?
+        ON CONFLICT (user_id, day, mood) DO UPDATE
+        SET entry_count = entry_count + 1,
+            intensity_sum = intensity_sum + excluded.intensity_sum,
+            intensity_min = MIN(intensity_min, excluded.intensity_min),
+            intensity_max = MAX(intensity_max, excluded.intensity_max)
+    """, (cursor.lastrowid,))
+    conn.execute("""
+        INSERT INTO user_data_versions (user_id, mood_version) VALUES (?, 1)
+        ON CONFLICT (user_id) DO UPDATE SET mood_version = mood_version + 1
+    """, (user_id,))
+
+def save_mood_log(user_id, mood, intensity, notes=""):
+    """Save mood log and fold it into the daily rollup in the same transaction
+    
+    Write-behind like save_chat_message; returns a Future.
+    """
+    return get_db_writer().submit(_insert_mood_log, user_id, mood, intensity, notes, user_id=user_id)
+
+def get_mood_data_version(user_id):
+    """Get a counter that changes whenever the user's mood data changes"""
+    wait_for_user_writes(user_id)
+    with pool.connection() as conn:
+        result = conn.execute(
+            "SELECT mood_version FROM user_data_versions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+    return result[0] if result else 0
 
 def get_mood_history(user_id, limit=30):
     """Get user's mood history"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT mood, intensity, timestamp FROM mood_logs
-        WHERE user_id = ?
-        ORDER BY timestamp DESC
-        LIMIT ?
-    """, (user_id, limit))
-    results = cursor.fetchall()
-    conn.close()
-    return results
+    wait_for_user_writes(user_id)
+    with pool.connection() as conn:
+        return conn.execute("""
+            SELECT mood, intensity, timestamp FROM mood_logs
+            WHERE user_id = ?
+            ORDER BY timestamp DESC
+            LIMIT ?
+        """, (user_id, limit)).fetchall()
 
-def log_crisis_alert(user_id, trigger_message):
-    """Log a potential crisis alert"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
+def get_mood_stats(user_id):
+    """Get (entries, average, lowest, highest) intensity over all mood logs"""
+    wait_for_user_writes(user_id)
+    with pool.connection() as conn:
+        entries, total, lowest, highest = conn.execute("""
+            SELECT SUM(entry_count), SUM(intensity_sum), MIN(intensity_min), MAX(intensity_max)
+            FROM mood_daily_rollup
+            WHERE user_id = ?
+        """, (user_id,)).fetchone()
+    if not entries:
+        return 0, None, None, None
+    return entries, total / entries, lowest, highest
+
+def get_mood_distribution(user_id):
+    """Get (mood, entries) pairs over all mood logs, most frequent first"""
+    wait_for_user_writes(user_id)
+    with pool.connection() as conn:
+        return conn.execute("""
+            SELECT mood, SUM(entry_count) AS entries FROM mood_daily_rollup
+            WHERE user_id = ?
+            GROUP BY mood
+            ORDER BY entries DESC
+        """, (user_id,)).fetchall()
+
+def get_mood_daily_series(user_id, since_day=None):
+    """Get (day, entries, average, lowest, highest) per day, oldest first
+    
+    Reads the rollup, so the cost grows with the number of days rather than
+    the number of entries. since_day ('YYYY-MM-DD') limits the range.
+    """
+    wait_for_user_writes(user_id)
+    with pool.connection() as conn:
+        return conn.execute("""
+            SELECT day, SUM(entry_count), CAST(SUM(intensity_sum) AS REAL) / SUM(entry_count),
+                   MIN(intensity_min), MAX(intensity_max)
+            FROM mood_daily_rollup
+            WHERE user_id = ? AND day >= ?
+            GROUP BY day
+            ORDER BY day
+        """, (user_id, since_day or "")).fetchall()
+
+def _insert_crisis_alert(conn, user_id, trigger_message):
+    conn.execute("""
         INSERT INTO crisis_alerts (user_id, trigger_message)
         VALUES (?, ?)
     """, (user_id, trigger_message))
-    conn.commit()
-    conn.close()
+
+def log_crisis_alert(user_id, trigger_message):
+    """Log a potential crisis alert"""
+    with pool.transaction() as conn:
+        _insert_crisis_alert(conn, user_id, trigger_message)
+
+def log_crisis_alerts(alerts):
+    """Log a batch of (user_id, trigger_message, timestamp) alerts in one transaction"""
+    with pool.transaction() as conn:
+        conn.executemany("""
+            INSERT INTO crisis_alerts (user_id, trigger_message, timestamp)
+            VALUES (?, ?, ?)
+        """, alerts)
 
 def get_therapy_progress(user_id, module_name):
     """Get therapy module progress"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT completion_percentage FROM therapy_progress
-        WHERE user_id = ? AND module_name = ?
-    """, (user_id, module_name))
-    result = cursor.fetchone()
-    conn.close()
+    wait_for_user_writes(user_id)
+    with pool.connection() as conn:
+        result = conn.execute("""
+            SELECT completion_percentage FROM therapy_progress
+            WHERE user_id = ? AND module_name = ?
+        """, (user_id, module_name)).fetchone()
     return result[0] if result else 0
 
+def _upsert_therapy_progress(conn, user_id, module_name, completion_percentage):
+    conn.execute("""
+        INSERT INTO therapy_progress (user_id, module_name, completion_percentage)
+        VALUES (?, ?, ?)
+        ON CONFLICT (user_id, module_name) DO UPDATE
+        SET completion_percentage = excluded.completion_percentage,
+            last_accessed = CURRENT_TIMESTAMP
+    """, (user_id, module_name, completion_percentage))
+
 def update_therapy_progress(user_id, module_name, completion_percentage):
     """Update therapy module progress"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Check if record exists
-    cursor.execute("""
-        SELECT id FROM therapy_progress
-        WHERE user_id = ? AND module_name = ?
-    """, (user_id, module_name))
-    
-    if cursor.fetchone():
-        cursor.execute("""
-            UPDATE therapy_progress
-            SET completion_percentage = ?, last_accessed = CURRENT_TIMESTAMP
-            WHERE user_id = ? AND module_name = ?
-        """, (completion_percentage, user_id, module_name))
-    else:
-        cursor.execute("""
-            INSERT INTO therapy_progress (user_id, module_name, completion_percentage)
-            VALUES (?, ?, ?)
-        """, (user_id, module_name, completion_percentage))
-    
-    conn.commit()
-    conn.close()
+    with pool.transaction() as conn:
+        _upsert_therapy_progress(conn, user_id, module_name, completion_percentage)
+
+# Async API: writes go through the writer thread's group commits and are
+# awaited until committed, reads run on the default executor, so neither
+# blocks the caller's event loop
+
+async def asave_chat_message(user_id, message, response, language="en"):
+    """Save chat message and response once committed, without blocking the event loop"""
+    return await asyncio.wrap_future(save_chat_message(user_id, message, response, language))
+
+async def asave_mood_log(user_id, mood, intensity, notes=""):
+    """Save mood log once committed, without blocking the event loop"""
+    return await asyncio.wrap_future(save_mood_log(user_id, mood, intensity, notes))
+
+async def alog_crisis_alert(user_id, trigger_message):
+    """Log a potential crisis alert without blocking the event loop"""
+    return await get_db_writer().asubmit(_insert_crisis_alert, user_id, trigger_message, user_id=user_id)
+
+async def aupdate_therapy_progress(user_id, module_name, completion_percentage):
+    """Update therapy module progress without blocking the event loop"""
+    return await get_db_writer().asubmit(
+        _upsert_therapy_progress, user_id, module_name, completion_percentage, user_id=user_id
+    )
+
+async def aget_chat_history_page(user_id, before_id=None, limit=20):
+    """Async counterpart of get_chat_history_page"""
+    return await asyncio.to_thread(get_chat_history_page, user_id, before_id, limit)
+
+async def aget_mood_history(user_id, limit=30):
+    """Async counterpart of get_mood_history"""
+    return await asyncio.to_thread(get_mood_history, user_id, limit)
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from config import (
+    DATABASE_PATH, DB_POOL_SIZE, DB_BUSY_TIMEOUT_MS, DB_MMAP_SIZE,
+    DB_CACHE_SIZE_KIB, DB_STATEMENT_CACHE_SIZE
+)
+
+
+class ConnectionPool:
+    """Pool of long-lived SQLite connections tuned for concurrent sessions
+
+    Every connection runs in WAL mode so readers never block on the writer,
+    with ``synchronous=NORMAL``, a busy timeout instead of immediate
+    "database is locked" errors, memory-mapped reads and a larger page
+    cache. Compiled statements are cached per connection, so the repeated
+    queries issued by the app are prepared once per connection.
+
+    A thread keeps the connection it checked out for as long as it holds
+    it, so nested helpers reuse the same connection and transaction.
+    """
+
+    def __init__(self, path, max_idle=DB_POOL_SIZE):
+        self.path = path
+        self.max_idle = max_idle
+        self.created = 0
+        self.reused = 0
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE)}")
+        conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KIB)}")
+        self.created += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            # Re-entrant use from the same thread shares the connection
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        else:
+            self.reused += 1
+        self._local.conn = conn
+        self._local.depth = 0
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Check out a connection and commit on success, roll back on error"""
+        with self.connection() as conn:
+            if getattr(self._local, "in_transaction", False):
+                # Already inside an outer transaction on this thread
+                yield conn
+                return
+            self._local.in_transaction = True
+            try:
+                with conn:
+                    yield conn
+            finally:
+                self._local.in_transaction = False
+
+    def close_all(self):
+        """Close idle connections, e.g. on shutdown or after moving the file"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        return {"created": self.created, "reused": self.reused, "idle": len(self._idle)}
+
+
+# Shared by database.py and auth.py
+pool = ConnectionPool(DATABASE_PATH)
@@ -0,0 +1,220 @@
+import asyncio
+import atexit
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from config import WRITE_BATCH_ROWS, WRITE_BATCH_WAIT_MS, WRITE_LAG_WINDOW
+from db_pool import pool
+
+# Queued by a reader waiting on buffered writes: commit now, don't wait out the window
+_FLUSH = object()
+
+
+class _Write:
+    __slots__ = ("future", "fn", "args", "user_id", "submitted_at")
+
+    def __init__(self, fn, args, user_id):
+        self.future = Future()
+        self.fn = fn
+        self.args = args
+        self.user_id = user_id
+        self.submitted_at = time.perf_counter()
+
+
+class DatabaseWriter:
+    """Write-behind buffer that group-commits writes on one dedicated thread
+
+    ``submit`` queues ``fn(conn, *args)`` and returns at once. The writer
+    thread takes up to ``batch_rows`` queued writes, waiting at most
+    ``max_wait_ms`` after the first for others to join, and applies them
+    in submission order in a single transaction, so concurrent sessions
+    share one commit instead of contending for SQLite's write lock. If the
+    batch fails, each write is retried in its own transaction so one bad
+    row only fails its own Future.
+
+    Writes tagged with a user_id are counted until committed;
+    ``wait_for_user`` blocks on them, which is how reads of a user's data
+    see that user's own buffered writes.
+    """
+
+    def __init__(self, batch_rows=WRITE_BATCH_ROWS, max_wait_ms=WRITE_BATCH_WAIT_MS, lag_window=WRITE_LAG_WINDOW):
+        self.batch_rows = batch_rows
+        self.max_wait = max_wait_ms / 1000
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.batch_sizes = deque(maxlen=lag_window)
+        self.lags = deque(maxlen=lag_window)
+        self._queue = queue.Queue()
+        self._idle = threading.Condition()
+        self._pending = 0
+        self._pending_by_user = {}
+        self._flush_requested = False
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, user_id=None):
+        """Queue fn(conn, *args) and return a Future of its result"""
+        write = _Write(fn, args, user_id)
+        with self._idle:
+            self._pending += 1
+            if user_id is not None:
+                self._pending_by_user[user_id] = self._pending_by_user.get(user_id, 0) + 1
+            self.submitted += 1
+        self._queue.put(write)
+        return write.future
+
+    async def asubmit(self, fn, *args, user_id=None):
+        """Queue fn(conn, *args) and await its result"""
+        return await asyncio.wrap_future(self.submit(fn, *args, user_id=user_id))
+
+    def _next_batch(self):
+        batch = []
+        while not batch:
+            write = self._queue.get()
+            if write is _FLUSH:
+                self._flush_requested = False
+            else:
+                batch.append(write)
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.batch_rows:
+            try:
+                write = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    write = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if write is _FLUSH:
+                self._flush_requested = False
+                break
+            batch.append(write)
+        return batch
+
+    def _run(self):
+        while True:
+            writes = self._next_batch()
+            batch = [write for write in writes if write.future.set_running_or_notify_cancel()]
+            results = {}
+            if not batch:
+                self._settle(writes, batch, results)
+                continue
+            try:
+                with pool.transaction() as conn:
+                    for write in batch:
+                        results[write] = write.fn(conn, *write.args)
+            except Exception:
+                # Isolate the failing write; the others commit on their own
+                results = {}
+                for write in batch:
+                    try:
+                        with pool.transaction() as conn:
+                            results[write] = write.fn(conn, *write.args)
+                    except Exception as e:
+                        print(f"Database write {write.fn.__name__} failed: {e}")
+                        results[write] = e
+            self._settle(writes, batch, results)
+
+    def _settle(self, writes, batch, results):
+        committed_at = time.perf_counter()
+        with self._idle:
+            if batch:
+                self.batches += 1
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self.batch_sizes.append(len(batch))
+            for write in batch:
+                self.lags.append(committed_at - write.submitted_at)
+                if isinstance(results[write], Exception):
+                    self.failed += 1
+                else:
+                    self.completed += 1
+            # Cancelled writes were never run but still count as settled
+            self._pending -= len(writes)
+            for write in writes:
+                if write.user_id is not None:
+                    remaining = self._pending_by_user[write.user_id] - 1
+                    if remaining:
+                        self._pending_by_user[write.user_id] = remaining
+                    else:
+                        del self._pending_by_user[write.user_id]
+            self._idle.notify_all()
+        for write in batch:
+            result = results[write]
+            if isinstance(result, Exception):
+                write.future.set_exception(result)
+            else:
+                write.future.set_result(result)
+
+    def wait_for_user(self, user_id, timeout=None):
+        """Block until every write queued for user_id has been committed"""
+        with self._idle:
+            if user_id not in self._pending_by_user:
+                return True
+            self._request_flush()
+            return self._idle.wait_for(lambda: user_id not in self._pending_by_user, timeout)
+
+    def flush(self, timeout=None):
+        """Block until every queued write has been committed"""
+        with self._idle:
+            if self._pending:
+                self._request_flush()
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def _request_flush(self):
+        # Called holding self._idle; one marker in the queue is enough
+        if not self._flush_requested:
+            self._flush_requested = True
+            self._queue.put(_FLUSH)
+
+    def stats(self):
+        """Queue depth, commit batch sizes and submit-to-commit lag"""
+        with self._idle:
+            sizes = list(self.batch_sizes)
+            lags = sorted(self.lags)
+            return {
+                "queue_depth": self._pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "batches": self.batches,
+                "average_batch_rows": sum(sizes) / len(sizes) if sizes else 0.0,
+                "largest_batch_rows": self.largest_batch,
+                "p50_lag_ms": _percentile_ms(lags, 0.50),
+                "p99_lag_ms": _percentile_ms(lags, 0.99),
+                "max_lag_ms": round(lags[-1] * 1000, 2) if lags else None,
+            }
+
+
+def _percentile_ms(ordered, fraction):
+    if not ordered:
+        return None
+    return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000, 2)
+
+
+_db_writer = None
+_db_writer_lock = threading.Lock()
+
+
+def get_db_writer():
+    """Return the process-wide database writer, starting it on first use"""
+    global _db_writer
+    if _db_writer is None:
+        with _db_writer_lock:
+            if _db_writer is None:
+                _db_writer = DatabaseWriter()
+                atexit.register(_db_writer.flush, 5)
+    return _db_writer
+
+
+def wait_for_user_writes(user_id, timeout=None):
+    """Read-your-writes barrier for a user's buffered writes; free if none are queued"""
+    if _db_writer is not None:
+        _db_writer.wait_for_user(user_id, timeout)
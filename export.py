@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import tempfile
+import zipfile
+
+from archive import ARCHIVE_COLUMNS, iter_archived_rows
+from config import EXPORT_CHUNK_ROWS
+from db_pool import pool
+from db_writer import wait_for_user_writes
+
+# Exportable per-user tables and the columns written for each
+EXPORT_TABLES = {
+    "mood_logs": ["id", "mood", "intensity", "notes", "timestamp"],
+    "chat_history": ARCHIVE_COLUMNS,
+    "crisis_alerts": ["id", "trigger_message", "timestamp"],
+    "therapy_progress": ["id", "module_name", "completion_percentage", "last_accessed"],
+}
+
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def iter_rows(table, user_id, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield chunks of a user's rows from table, oldest first
+
+    Each chunk is its own short keyset query (``id > last id``), so no
+    read transaction or pooled connection is held while the caller is
+    busy with the previous chunk, however slowly it is consumed. Chat
+    history starts with the user's archived turns, one chunk per segment.
+    """
+    columns = EXPORT_TABLES[table]
+    query = f"""
+        SELECT {", ".join(columns)} FROM {table}
+        WHERE user_id = ? AND id > ?
+        ORDER BY id
+        LIMIT ?
+    """
+    wait_for_user_writes(user_id)
+    last_id = 0
+    if table == "chat_history":
+        # Archived turns are older than every hot one, so they come first
+        for rows in iter_archived_rows(user_id):
+            yield rows
+            last_id = rows[-1][0]
+    while True:
+        with pool.connection() as conn:
+            rows = conn.execute(query, (user_id, last_id, chunk_rows)).fetchall()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_rows:
+            return
+        last_id = rows[-1][0]
+
+
+def iter_csv(table, user_id, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield a table export as CSV text, one piece per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_TABLES[table])
+    for rows in iter_rows(table, user_id, chunk_rows):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(table, user_id, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield a table export as newline-delimited JSON, one piece per chunk"""
+    columns = EXPORT_TABLES[table]
+    for rows in iter_rows(table, user_id, chunk_rows):
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows
+        )
+
+
+def iter_export(table, user_id, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield a single table export as UTF-8 bytes"""
+    pieces = iter_csv if fmt == "csv" else iter_ndjson
+    for piece in pieces(table, user_id, chunk_rows):
+        yield piece.encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable stream that hands its bytes back on drain()"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        # zipfile records member offsets from tell() on unseekable streams
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(user_id, tables=None, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield a zip archive with one export file per table, as it is written"""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for table in tables or EXPORT_TABLES:
+            with archive.open(f"{table}.{fmt}", "w") as member:
+                for piece in iter_export(table, user_id, fmt, chunk_rows):
+                    member.write(piece)
+                    data = sink.drain()
+                    if data:
+                        yield data
+    yield sink.drain()
+
+
+def export_to_file(chunks):
+    """Write export chunks to a rewound temporary file
+
+    For frameworks that need a file rather than an iterator. The file is
+    unbuffered (a raw io.FileIO) and is deleted once closed. Handing it to
+    st.download_button does not stream: Streamlit reads the whole file into
+    memory to serve it, and the download can only start once the export is
+    finished. Use the generators directly (scripts/export_user_data.py)
+    where memory must stay flat.
+    """
+    spool = tempfile.TemporaryFile(buffering=0)
+    for chunk in chunks:
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
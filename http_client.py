@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    API_POOL_CONNECTIONS, API_POOL_SIZE, API_CONNECT_TIMEOUT,
+    API_READ_TIMEOUT, API_MAX_RETRIES, API_RETRY_BACKOFF, API_ASYNC_MAX_CONNECTIONS
+)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def build_session(pool_connections=API_POOL_CONNECTIONS, pool_size=API_POOL_SIZE,
+                  max_retries=API_MAX_RETRIES, backoff=API_RETRY_BACKOFF):
+    """Create a keep-alive session with pooled connections and retry on 429/5xx"""
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        # Never resend after the request was sent; False (not 0) re-raises
+        # the read timeout itself rather than a generic connection error
+        read=False,
+        status=max_retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        # Completions are not idempotent in general, but a 429/5xx means the
+        # request was rejected before any tokens were produced
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_size,
+        pool_block=False,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """Return the process-wide session shared by every chat session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def post_json(url, payload, headers=None, stream=False, session=None):
+    """POST a JSON payload on a pooled connection with connect/read timeouts"""
+    return (session or get_session()).post(
+        url,
+        json=payload,
+        headers=headers,
+        stream=stream,
+        timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+    )
+
+
+def close_session():
+    """Close pooled connections, e.g. on shutdown"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+# One AsyncClient per event loop: httpx connections are bound to the loop
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Return the pooled httpx.AsyncClient for the running event loop"""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(API_READ_TIMEOUT, connect=API_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=API_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=API_POOL_SIZE
+            )
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _retry_delay(response, attempt, backoff):
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return float(retry_after)
+    return backoff * (2 ** attempt)
+
+
+@asynccontextmanager
+async def apost_json_stream(url, payload, headers=None, client=None,
+                            max_retries=API_MAX_RETRIES, backoff=API_RETRY_BACKOFF):
+    """POST a JSON payload and yield the streaming httpx response
+
+    Mirrors the sync session: 429/5xx responses are retried with
+    exponential backoff (honouring Retry-After) before any body is read.
+    """
+    client = client or get_async_client()
+    attempt = 0
+    while True:
+        request = client.build_request("POST", url, json=payload, headers=headers)
+        response = await client.send(request, stream=True)
+        if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+            break
+        delay = _retry_delay(response, attempt, backoff)
+        # Drain the short error body so the connection goes back to the pool
+        await response.aread()
+        await response.aclose()
+        await asyncio.sleep(delay)
+        attempt += 1
+    try:
+        yield response
+    finally:
+        await response.aclose()
+
+
+async def aclose_async_client():
+    """Close the running loop's AsyncClient, e.g. on shutdown"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+
+PROFILE_IMPORTS = os.getenv("PROFILE_IMPORTS", "") not in ("", "0", "false")
+
+
+class _TimedLoader:
+    """Wraps a module loader to time its exec_module call"""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter()
+        started = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._leave(module.__name__, time.perf_counter() - started)
+
+
+class ImportProfiler:
+    """Meta path hook that records per-module import cost
+
+    Inclusive time covers a module and everything it imports; self time
+    excludes nested imports, which makes the expensive module stand out.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._children = []
+        self._finding = set()
+
+    def find_spec(self, name, path=None, target=None):
+        # Guard against finding ourselves while asking the other finders
+        if name in self._finding:
+            return None
+        self._finding.add(name)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.discard(name)
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def _enter(self):
+        self._children.append(0.0)
+
+    def _leave(self, name, inclusive):
+        nested = self._children.pop()
+        if self._children:
+            self._children[-1] += inclusive
+        self.timings[name] = (inclusive, inclusive - nested)
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def report(self, limit=25, file=None):
+        """Print the slowest modules by self time"""
+        rows = sorted(self.timings.items(), key=lambda item: item[1][1], reverse=True)
+        total = sum(self_time for _, self_time in self.timings.values())
+        print(f"Import profile: {len(rows)} modules, {total * 1000:.1f} ms total", file=file)
+        print(f"{'self ms':>9} {'incl ms':>9}  module", file=file)
+        for name, (inclusive, self_time) in rows[:limit]:
+            print(f"{self_time * 1000:>9.1f} {inclusive * 1000:>9.1f}  {name}", file=file)
+
+
+profiler = ImportProfiler()
+
+
+def install_from_env():
+    """Start profiling imports when PROFILE_IMPORTS is set"""
+    if PROFILE_IMPORTS:
+        profiler.install()
+    return PROFILE_IMPORTS
@@ -0,0 +1,391 @@
+import copy
+import queue
+import threading
+import time
+from collections import deque
+
+from view_cache import LRUCache
+
+_DONE = object()
+
+
+class InferenceRequest:
+    """A queued prompt whose generated text is streamed back to the caller"""
+
+    def __init__(self, input_ids, max_new_tokens, temperature, top_p, prefix_ids=None, session_stats=None):
+        self.input_ids = input_ids
+        self.prefix_ids = tuple(prefix_ids) if prefix_ids else None
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.top_p = top_p
+        self.session_stats = session_stats
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.first_token_at = None
+        self.finished_at = None
+        self.generated_tokens = 0
+        self.assisted = False
+        self.draft_proposed = 0
+        self.draft_accepted = 0
+        self.error = None
+        self.cancelled = False
+        self._chunks = queue.Queue()
+
+    @property
+    def generation_key(self):
+        """Requests are only batched with others sharing these settings"""
+        return (self.max_new_tokens, self.temperature, self.top_p)
+
+    def push(self, text):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self._chunks.put(text)
+
+    @property
+    def use_draft(self):
+        return self.session_stats is None or self.session_stats.use_draft
+
+    def cancel(self):
+        """Stop generating for this request and end its stream
+
+        The worker skips a cancelled request that is still queued, and stops
+        a running generate() once every request in its batch is cancelled.
+        """
+        self.cancelled = True
+        self._chunks.put(_DONE)
+
+    def finish(self, error=None):
+        self.error = error
+        self.finished_at = time.perf_counter()
+        if error is None and self.started_at is not None and self.session_stats is not None:
+            self.session_stats.record(self)
+        self._chunks.put(_DONE)
+
+    def __iter__(self):
+        """Yield text chunks as they are generated"""
+        while True:
+            chunk = self._chunks.get()
+            if chunk is _DONE:
+                break
+            yield chunk
+        if self.error is not None:
+            raise self.error
+
+    def result(self):
+        """Block until generation finishes and return the full text"""
+        return "".join(self)
+
+
+class DecodingStats:
+    """One session's decode speed and draft-model acceptance rate
+
+    Assisted decoding stays on while the share of draft tokens the main
+    model accepts is at least ``min_acceptance``. The rate is only judged
+    once ``warmup_tokens`` draft tokens have been proposed; below the
+    threshold the session falls back to plain decoding for good, since
+    verifying drafts that keep being rejected only adds work.
+    """
+
+    def __init__(self, min_acceptance=0.5, warmup_tokens=64):
+        self.min_acceptance = min_acceptance
+        self.warmup_tokens = warmup_tokens
+        self.use_draft = True
+        self.draft_proposed = 0
+        self.draft_accepted = 0
+        self.tokens = {"assisted": 0, "plain": 0}
+        self.seconds = {"assisted": 0.0, "plain": 0.0}
+        self._lock = threading.Lock()
+
+    @property
+    def acceptance_rate(self):
+        return self.draft_accepted / self.draft_proposed if self.draft_proposed else None
+
+    def record(self, request):
+        mode = "assisted" if request.assisted else "plain"
+        with self._lock:
+            self.tokens[mode] += request.generated_tokens
+            self.seconds[mode] += request.finished_at - request.started_at
+            if not request.assisted:
+                return
+            self.draft_proposed += request.draft_proposed
+            self.draft_accepted += request.draft_accepted
+            if self.draft_proposed >= self.warmup_tokens and self.acceptance_rate < self.min_acceptance:
+                self.use_draft = False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "use_draft": self.use_draft,
+                "draft_proposed": self.draft_proposed,
+                "draft_accepted": self.draft_accepted,
+                "acceptance_rate": self.acceptance_rate,
+                "tokens_per_sec": {
+                    mode: self.tokens[mode] / self.seconds[mode] if self.seconds[mode] else None
+                    for mode in self.tokens
+                },
+            }
+
+
+class _BatchStreamer:
+    """Routes each row of a batched generate() call to its own request
+
+    Implements the put/end protocol of transformers' BaseStreamer without
+    subclassing it, so importing this module does not import transformers.
+    """
+
+    def __init__(self, tokenizer, requests):
+        self.tokenizer = tokenizer
+        self.requests = requests
+        self.token_ids = [[] for _ in requests]
+        self.emitted = [0] * len(requests)
+        self.finished = [False] * len(requests)
+        self.prompt_seen = False
+
+    def put(self, value):
+        # The first call carries the prompt ids, which are not streamed back
+        if not self.prompt_seen:
+            self.prompt_seen = True
+            return
+        # One token per row, except assisted decoding, which puts every
+        # accepted draft token plus the main model's own in one call
+        for row, token_ids in enumerate(value.reshape(len(self.requests), -1).tolist()):
+            request = self.requests[row]
+            if request.cancelled:
+                continue
+            if request.assisted:
+                request.draft_accepted += len(token_ids) - 1
+            for token_id in token_ids:
+                if self.finished[row]:
+                    break
+                if token_id == self.tokenizer.eos_token_id:
+                    self.finished[row] = True
+                    break
+                self.token_ids[row].append(token_id)
+                request.generated_tokens += 1
+            self._emit(row, final=False)
+
+    def end(self):
+        for row in range(len(self.requests)):
+            self._emit(row, final=True)
+
+    def _emit(self, row, final):
+        if self.requests[row].cancelled:
+            return
+        text = self.tokenizer.decode(self.token_ids[row], skip_special_tokens=True)
+        # Hold back incomplete multi-byte characters until the next token
+        if not final and text.endswith("�"):
+            return
+        if len(text) > self.emitted[row]:
+            self.requests[row].push(text[self.emitted[row]:])
+            self.emitted[row] = len(text)
+
+
+class _CancelledCriteria:
+    """Stopping criterion that ends generate() once its whole batch is cancelled
+
+    generate() can only stop a batch as a whole, so a cancelled request
+    sharing a batch with live ones keeps decoding, unstreamed, until they
+    finish. Called like a transformers StoppingCriteria.
+    """
+
+    def __init__(self, requests):
+        self.requests = requests
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return all(request.cancelled for request in self.requests)
+
+
+class InferenceWorker:
+    """Single thread that serves local generation for every session
+
+    Prompts submitted from any session are queued and grouped into padded
+    batches of up to ``max_batch_size``; the worker waits at most
+    ``max_wait_ms`` after the first prompt for others to join a batch.
+    ``num_threads`` sets torch's intra-op threads for this worker's thread
+    (0 keeps torch's default).
+
+    With a ``draft_model`` (a small model sharing the main model's
+    tokenizer) a prompt served on its own uses assisted decoding: the draft
+    proposes a few tokens and the main model verifies them in one forward
+    pass. transformers only supports this for single-prompt batches.
+    """
+
+    def __init__(self, loaded_model, max_batch_size=8, max_wait_ms=10, num_threads=0, draft_model=None,
+                 prefix_cache_size=8):
+        self.tokenizer = loaded_model.tokenizer
+        self.model = loaded_model.model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.num_threads = num_threads
+        self.draft = None
+        self.draft_calls = 0
+        if draft_model is not None:
+            if draft_model.tokenizer.get_vocab() == self.tokenizer.get_vocab():
+                self.draft = draft_model.model
+                # Each draft forward pass proposes one token. The draft may be
+                # shared with other workers, so calls are counted per thread.
+                self._draft_counter = draft_model.forward_counter()
+            else:
+                print(f"Draft model {draft_model.key[0]} has a different vocabulary; assisted decoding disabled")
+        self.batches = 0
+        self.batched_requests = 0
+        self._queue = queue.Queue()
+        self._pending = deque()
+        # One entry per distinct system prompt; bounded in case prefixes vary
+        self._prefix_cache = LRUCache(prefix_cache_size)
+
+        # Left padding keeps every prompt adjacent to its generated tokens
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        self._thread = threading.Thread(target=self._run, name="inference-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt, max_new_tokens=256, temperature=0.7, top_p=0.9, prefix_ids=None,
+               session_stats=None):
+        """Queue a prompt and return its streaming InferenceRequest
+
+        ``prompt`` is text or a list of token ids. When ``prefix_ids`` is
+        given the ids must start with it; the prefix's key/value cache is
+        computed once and reused so later prompts only prefill the rest.
+        ``session_stats`` is the submitting session's DecodingStats, which
+        records the request and decides whether it may use the draft model.
+        """
+        if isinstance(prompt, str):
+            prompt = self.tokenizer(prompt)["input_ids"]
+        request = InferenceRequest(prompt, max_new_tokens, temperature, top_p, prefix_ids, session_stats)
+        self._queue.put(request)
+        return request
+
+    def generate(self, prompt, **kwargs):
+        """Queue a prompt and block until its full completion is ready"""
+        return self.submit(prompt, **kwargs).result()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() + len(self._pending),
+            "batches": self.batches,
+            "average_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+            "prefix_cache": self._prefix_cache.stats(),
+            "draft_calls": self.draft_calls,
+        }
+
+    def _next_batch(self):
+        first = self._pending.popleft() if self._pending else self._queue.get()
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+
+        # Requests with other generation settings wait for a later batch
+        held_back = deque()
+        while self._pending and len(batch) < self.max_batch_size:
+            request = self._pending.popleft()
+            (batch if request.generation_key == first.generation_key else held_back).append(request)
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            (batch if request.generation_key == first.generation_key else held_back).append(request)
+        self._pending.extendleft(reversed(held_back))
+        return batch
+
+    def _run(self):
+        if self.num_threads:
+            import torch
+            torch.set_num_threads(self.num_threads)
+        while True:
+            batch = self._next_batch()
+            # Requests cancelled while queued, e.g. hedged away, never start
+            for request in batch:
+                if request.cancelled:
+                    request.finish()
+            batch = [request for request in batch if not request.cancelled]
+            if not batch:
+                continue
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                for request in batch:
+                    request.finish(error=e)
+            else:
+                for request in batch:
+                    request.finish()
+
+    def _run_batch(self, batch):
+        import torch
+        from transformers import StoppingCriteriaList
+
+        self.batches += 1
+        self.batched_requests += len(batch)
+        settings = batch[0]
+
+        # Padding would shift a cached prefix's positions, so the prefix
+        # cache is only used when a prompt is served on its own
+        past_key_values = None
+        if len(batch) == 1 and settings.prefix_ids:
+            past_key_values = self._prefix_past(settings.prefix_ids)
+
+        assistant_model = None
+        if len(batch) == 1 and self.draft is not None and settings.use_draft:
+            assistant_model = self.draft
+            settings.assisted = True
+
+        inputs = self.tokenizer.pad(
+            {"input_ids": [request.input_ids for request in batch]},
+            return_tensors="pt"
+        ).to(self.model.device)
+        draft_calls = self._draft_counter.count() if assistant_model is not None else 0
+        for request in batch:
+            request.started_at = time.perf_counter()
+        try:
+            with torch.inference_mode():
+                self.model.generate(
+                    input_ids=inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"],
+                    past_key_values=past_key_values,
+                    assistant_model=assistant_model,
+                    max_new_tokens=settings.max_new_tokens,
+                    temperature=settings.temperature,
+                    top_p=settings.top_p,
+                    do_sample=True,
+                    pad_token_id=self.tokenizer.pad_token_id,
+                    stopping_criteria=StoppingCriteriaList([_CancelledCriteria(batch)]),
+                    streamer=_BatchStreamer(self.tokenizer, batch)
+                )
+        finally:
+            if assistant_model is not None:
+                settings.draft_proposed = self._draft_counter.count() - draft_calls
+                self.draft_calls += settings.draft_proposed
+
+    def _prefix_past(self, prefix_ids):
+        import torch
+
+        def build():
+            with torch.inference_mode():
+                input_ids = torch.tensor([prefix_ids], device=self.model.device)
+                return self.model(input_ids=input_ids, use_cache=True).past_key_values
+
+        past = self._prefix_cache.get_or_build(prefix_ids, build)
+        # Legacy tuple caches are immutable; cache objects are extended in place
+        return past if isinstance(past, tuple) else copy.deepcopy(past)
+
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def get_worker(loaded_model, max_batch_size=8, max_wait_ms=10, num_threads=0, draft_model=None,
+               prefix_cache_size=8):
+    """Return the process-wide worker serving a registry model"""
+    with _workers_lock:
+        worker = _workers.get(loaded_model.key)
+        if worker is None:
+            worker = InferenceWorker(
+                loaded_model, max_batch_size, max_wait_ms, num_threads, draft_model, prefix_cache_size
+            )
+            _workers[loaded_model.key] = worker
+        return worker
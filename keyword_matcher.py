@@ -0,0 +1,167 @@
+import unicodedata
+from collections import deque
+from functools import lru_cache
+
+NUKTA = "़"
+VISARGA = "ः"
+
+# Inflections a Latin keyword may carry and still count as the same word
+LATIN_SUFFIXES = ("", "s", "d", "es", "ed", "ing")
+
+
+@lru_cache(maxsize=4096)
+def _normalize_char(char):
+    # NFKD folds compatibility forms and splits every precomposed nukta
+    # letter, including U+0929/U+0931/U+0934 which NFKC would recompose, so
+    # dropping the nukta matches both spellings. Casefolding can produce
+    # composed letters again, hence the second decomposition.
+    # Visarga is often typed as an ASCII colon, and normalisation keeps them
+    # apart. Folding to the colon, which is not a word character, can only
+    # add word boundaries, never hide one before a keyword.
+    decomposed = unicodedata.normalize("NFKD", unicodedata.normalize("NFKD", char).casefold())
+    return decomposed.replace(NUKTA, "").replace(VISARGA, ":")
+
+
+def normalize(text):
+    """Normalise text the same way keywords are normalised before matching
+
+    The result is the NFKD form of the whole message, casefolded, without
+    nuktas and with visarga spelled as a colon. Returns the normalised string
+    and, for each of its characters, the index of the original character it
+    came from so matches map back to spans in the caller's text.
+    """
+    chars = []
+    origins = []
+    for index, char in enumerate(text):
+        for folded in _normalize_char(char):
+            chars.append(folded)
+            origins.append(index)
+    _reorder_marks(chars, origins)
+    return "".join(chars), origins
+
+
+def _reorder_marks(chars, origins):
+    # Decomposing character by character leaves combining marks in input
+    # order; NFKD of the whole text sorts each run of them by combining class
+    start = 0
+    while start < len(chars):
+        if not unicodedata.combining(chars[start]):
+            start += 1
+            continue
+        end = start
+        while end < len(chars) and unicodedata.combining(chars[end]):
+            end += 1
+        if end - start > 1:
+            run = sorted(zip(chars[start:end], origins[start:end]), key=lambda pair: unicodedata.combining(pair[0]))
+            chars[start:end] = [char for char, _ in run]
+            origins[start:end] = [origin for _, origin in run]
+        start = end
+
+
+@lru_cache(maxsize=4096)
+def _is_word_char(char):
+    # Devanagari vowel signs and viramas are marks, not letters, but they
+    # are part of the word they attach to
+    return char.isalnum() or unicodedata.category(char).startswith("M")
+
+
+def _is_latin(char):
+    return "LATIN" in unicodedata.name(char, "")
+
+
+def _suffix_allowed(text, end):
+    suffix_end = end
+    while suffix_end < len(text) and suffix_end - end < 4 and _is_word_char(text[suffix_end]):
+        suffix_end += 1
+    return text[end:suffix_end] in LATIN_SUFFIXES
+
+
+class KeywordMatch:
+    """A keyword found in a message, with its span in the original text"""
+
+    def __init__(self, keyword, language, start, end):
+        self.keyword = keyword
+        self.language = language
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"KeywordMatch({self.keyword!r}, {self.language!r}, {self.start}, {self.end})"
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over normalised keywords from every language
+
+    Matching is a single pass over the message regardless of how many
+    keywords are compiled in. A match must start at a word boundary. Latin
+    keywords must also end at one, allowing only simple inflections, so "die"
+    matches "died" but not "diet"; Devanagari keywords are stems and may be
+    followed by any inflection.
+    """
+
+    def __init__(self, keywords_by_language):
+        # State 0 is the root; goto is a list of dicts for compactness
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for language, keywords in keywords_by_language.items():
+            for keyword in keywords:
+                self._add(keyword, language)
+        self._build_failure_links()
+
+    def _add(self, keyword, language):
+        normalized, _ = normalize(keyword)
+        if not normalized:
+            return
+        state = 0
+        for char in normalized:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        # A word shared by several languages is reported once, for the first
+        if any(existing[2] == len(normalized) for existing in self._output[state]):
+            return
+        whole_word = _is_latin(normalized[-1])
+        self._output[state].append((keyword, language, len(normalized), whole_word))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text):
+        """Return every keyword match in ``text`` as KeywordMatch objects"""
+        normalized, origins = normalize(text)
+        matches = []
+        state = 0
+        for position, char in enumerate(normalized):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword, language, length, whole_word in self._output[state]:
+                start = position - length + 1
+                if start > 0 and _is_word_char(normalized[start - 1]):
+                    continue
+                if whole_word and not _suffix_allowed(normalized, position + 1):
+                    continue
+                span = origins[start:position + 1]
+                matches.append(KeywordMatch(keyword, language, min(span), max(span) + 1))
+        return matches
+
+    def search(self, text):
+        """Return True if any keyword matches"""
+        return bool(self.find_all(text))
@@ -0,0 +1,317 @@
+import unicodedata
+from datetime import datetime, timezone
+
+
+def _create_tables(cursor):
+    """Create the application tables if they do not exist yet"""
+    # Users table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            email TEXT UNIQUE,
+            preferred_language TEXT DEFAULT 'English',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Chat history table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chat_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            response TEXT NOT NULL,
+            language TEXT DEFAULT 'en',
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+    
+    # Mood tracking table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mood_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            mood TEXT NOT NULL,
+            intensity INTEGER CHECK(intensity >= 1 AND intensity <= 10),
+            notes TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+    
+    # Crisis alerts table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS crisis_alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            trigger_message TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+    
+    # Therapy progress table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS therapy_progress (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            module_name TEXT NOT NULL,
+            completion_percentage INTEGER DEFAULT 0,
+            last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+
+
+def _add_indexes(cursor):
+    """Index per-user lookups and make therapy progress one row per module"""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chat_history_user_time
+        ON chat_history (user_id, timestamp DESC)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_mood_logs_user_time
+        ON mood_logs (user_id, timestamp DESC)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_crisis_alerts_user_time
+        ON crisis_alerts (user_id, timestamp DESC)
+    """)
+    
+    # Earlier versions could insert duplicates; keep the latest row
+    cursor.execute("""
+        DELETE FROM therapy_progress
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM therapy_progress GROUP BY user_id, module_name
+        )
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_therapy_progress_user_module
+        ON therapy_progress (user_id, module_name)
+    """)
+
+
+
+def _create_sessions(cursor):
+    """Server-side login sessions backing the signed session tokens"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            created_at INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL,
+            revoked_at INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sessions_user
+        ON sessions (user_id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sessions_expires
+        ON sessions (expires_at)
+    """)
+
+
+
+def _add_chat_history_cursor_index(cursor):
+    """Keyset index for paging a user's chat history by id"""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chat_history_user_id
+        ON chat_history (user_id, id)
+    """)
+
+
+
+def _create_mood_daily_rollup(cursor):
+    """Per user, day and mood intensity aggregates, backfilled from mood_logs"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mood_daily_rollup (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            mood TEXT NOT NULL,
+            entry_count INTEGER NOT NULL,
+            intensity_sum INTEGER NOT NULL,
+            intensity_min INTEGER NOT NULL,
+            intensity_max INTEGER NOT NULL,
+            PRIMARY KEY (user_id, day, mood)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        INSERT OR REPLACE INTO mood_daily_rollup
+            (user_id, day, mood, entry_count, intensity_sum, intensity_min, intensity_max)
+        SELECT user_id, date(timestamp), mood, COUNT(*), SUM(intensity), MIN(intensity), MAX(intensity)
+        FROM mood_logs
+        GROUP BY user_id, date(timestamp), mood
+    """)
+
+
+
+def _create_data_versions(cursor):
+    """Per-user counters bumped on writes, used to key cached views"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_data_versions (
+            user_id INTEGER PRIMARY KEY,
+            mood_version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+
+
+def _add_export_cursor_indexes(cursor):
+    """Keyset indexes for exporting a user's rows in id order"""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_mood_logs_user_id
+        ON mood_logs (user_id, id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_crisis_alerts_user_id
+        ON crisis_alerts (user_id, id)
+    """)
+
+
+# unicode61 treats combining marks as separators, which splits Hindi and
+# Marathi words at every vowel sign or virama (मुझे -> म, झ). Declaring the
+# Devanagari marks and ZWNJ/ZWJ token characters keeps such words whole.
+DEVANAGARI_TOKENCHARS = "".join(
+    chr(code) for code in range(0x0900, 0x0980) if unicodedata.category(chr(code)).startswith("M")
+) + "\u200c\u200d"
+
+# porter stems English words (exams -> exam) and leaves Devanagari ones as they are
+SEARCH_TOKENIZER = f"porter unicode61 remove_diacritics 2 tokenchars '{DEVANAGARI_TOKENCHARS}'"
+
+
+def _create_search_indexes(cursor):
+    """FTS5 indexes over chat turns and mood notes, kept in sync by triggers
+
+    External-content tables read their text from a view over the source
+    table, so the text is stored once. The view adds an ``owner`` column
+    holding a per-user token ('u42'), so restricting a search to one user
+    is an index lookup rather than a filter over every match.
+    """
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS chat_search_content AS
+        SELECT id, 'u' || user_id AS owner, message, response FROM chat_history
+    """)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS chat_search USING fts5(
+            owner, message, response,
+            content='chat_search_content', content_rowid='id',
+            tokenize="{SEARCH_TOKENIZER}"
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS chat_history_search_insert AFTER INSERT ON chat_history BEGIN
+            INSERT INTO chat_search (rowid, owner, message, response)
+            VALUES (new.id, 'u' || new.user_id, new.message, new.response);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS chat_history_search_delete AFTER DELETE ON chat_history BEGIN
+            INSERT INTO chat_search (chat_search, rowid, owner, message, response)
+            VALUES ('delete', old.id, 'u' || old.user_id, old.message, old.response);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS chat_history_search_update AFTER UPDATE ON chat_history BEGIN
+            INSERT INTO chat_search (chat_search, rowid, owner, message, response)
+            VALUES ('delete', old.id, 'u' || old.user_id, old.message, old.response);
+            INSERT INTO chat_search (rowid, owner, message, response)
+            VALUES (new.id, 'u' || new.user_id, new.message, new.response);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS mood_search_content AS
+        SELECT id, 'u' || user_id AS owner, notes FROM mood_logs
+    """)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS mood_search USING fts5(
+            owner, notes,
+            content='mood_search_content', content_rowid='id',
+            tokenize="{SEARCH_TOKENIZER}"
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS mood_logs_search_insert AFTER INSERT ON mood_logs BEGIN
+            INSERT INTO mood_search (rowid, owner, notes)
+            VALUES (new.id, 'u' || new.user_id, new.notes);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS mood_logs_search_delete AFTER DELETE ON mood_logs BEGIN
+            INSERT INTO mood_search (mood_search, rowid, owner, notes)
+            VALUES ('delete', old.id, 'u' || old.user_id, old.notes);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS mood_logs_search_update AFTER UPDATE ON mood_logs BEGIN
+            INSERT INTO mood_search (mood_search, rowid, owner, notes)
+            VALUES ('delete', old.id, 'u' || old.user_id, old.notes);
+            INSERT INTO mood_search (rowid, owner, notes)
+            VALUES (new.id, 'u' || new.user_id, new.notes);
+        END
+    """)
+
+    # Index the rows that already exist
+    cursor.execute("INSERT INTO chat_search (chat_search) VALUES ('rebuild')")
+    cursor.execute("INSERT INTO mood_search (mood_search) VALUES ('rebuild')")
+
+
+# Ordered, append-only: never edit a migration that has shipped
+MIGRATIONS = [
+    (1, "create tables", _create_tables),
+    (2, "add per-user indexes", _add_indexes),
+    (3, "create sessions", _create_sessions),
+    (4, "add chat history keyset index", _add_chat_history_cursor_index),
+    (5, "create mood daily rollup", _create_mood_daily_rollup),
+    (6, "create user data versions", _create_data_versions),
+    (7, "add export keyset indexes", _add_export_cursor_indexes),
+    (8, "create full-text search indexes", _create_search_indexes),
+]
+
+
+def get_schema_version(conn):
+    """Highest migration version applied to this database"""
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def run_migrations(conn):
+    """Apply every migration newer than the database's schema version
+
+    Each migration runs in its own IMMEDIATE transaction together with its
+    schema_version row, so a failed migration leaves no partial changes and
+    concurrent processes starting up apply each migration only once.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """)
+    
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have applied it while we waited for the lock
+            if version > get_schema_version(conn):
+                migrate(conn.cursor())
+                conn.execute(
+                    "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                    (version, description, datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+                )
+                applied.append(version)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return applied
@@ -0,0 +1,207 @@
+import importlib.util
+import os
+import threading
+import time
+
+from config import TORCH_NUM_THREADS, TORCH_INTEROP_THREADS
+
+# transformers (and torch) take seconds to import, so only check that it is
+# installed here and import it when a model is actually loaded
+TRANSFORMERS_AVAILABLE = importlib.util.find_spec("transformers") is not None
+
+# "int8" quantizes every nn.Linear to int8 weights after loading (CPU only)
+QUANTIZATION_MODES = ("none", "int8")
+
+
+def configure_torch_threads(num_threads=0, interop_threads=0):
+    """Apply CPU thread counts to torch; 0 keeps torch's default
+
+    The intra-op count applies to the calling thread's parallel regions,
+    so inference workers call this again from their own thread. The
+    inter-op pool can only be sized before torch first uses it, so a late
+    call leaves it as it is.
+    """
+    import torch
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads and torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            pass
+
+
+def _resident_memory_bytes():
+    """Current resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def quantize_int8(model):
+    """Swap a float model's linear layers for dynamically quantized int8 ones
+
+    Weights are stored as int8 and activations are quantized on the fly
+    per batch, which cuts linear-layer memory about 4x and speeds up CPU
+    matmuls. Embeddings and layer norms stay in float.
+    """
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class ForwardCounter:
+    """Forward passes of a shared model, counted per calling thread
+
+    One hook serves every user of the model. Each thread reads only its
+    own count, so passes run for other threads never show up in it.
+    """
+
+    def __init__(self, model):
+        self._counts = {}
+        model.register_forward_hook(self._hook)
+
+    def _hook(self, module, args, output):
+        thread = threading.get_ident()
+        self._counts[thread] = self._counts.get(thread, 0) + 1
+
+    def count(self):
+        """Forward passes made so far on the calling thread"""
+        return self._counts.get(threading.get_ident(), 0)
+
+
+class LoadedModel:
+    """Tokenizer and weights shared by every session using the same key"""
+
+    def __init__(self, key, tokenizer, model, load_seconds, memory_bytes):
+        self.key = key
+        self.tokenizer = tokenizer
+        self.model = model
+        self.load_seconds = load_seconds
+        self.memory_bytes = memory_bytes
+        self.sessions = 0
+        self._forward_counter = None
+        self._counter_lock = threading.Lock()
+
+    def forward_counter(self):
+        """The model's ForwardCounter, whose hook is registered on first use"""
+        with self._counter_lock:
+            if self._forward_counter is None:
+                self._forward_counter = ForwardCounter(self.model)
+            return self._forward_counter
+
+    def stats(self):
+        model_name, dtype, device, quantization = self.key
+        return {
+            "model_name": model_name,
+            "dtype": dtype,
+            "device": device,
+            "quantization": quantization,
+            "load_seconds": self.load_seconds,
+            "memory_bytes": self.memory_bytes,
+            "sessions": self.sessions,
+        }
+
+
+class ModelRegistry:
+    """Process-wide cache of local models keyed by (model name, dtype, device, quantization)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._models = {}
+        self._failures = {}
+
+    def get(self, model_name, dtype="auto", device="auto", quantization="none"):
+        """Return the shared LoadedModel for a key, loading it on first use"""
+        if not TRANSFORMERS_AVAILABLE:
+            return None
+
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode {quantization!r}")
+        # Dynamic int8 kernels run on CPU and quantize from float32 weights
+        if quantization != "none":
+            dtype, device = "float32", "cpu"
+
+        key = (model_name, dtype, device, quantization)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given key; the others wait and reuse it
+        with key_lock:
+            loaded = self._models.get(key)
+            if loaded is None and key not in self._failures:
+                loaded = self._load(key)
+        if loaded is not None:
+            with self._lock:
+                loaded.sessions += 1
+        return loaded
+
+    def _load(self, key):
+        model_name, dtype, device, quantization = key
+        try:
+            # Imported before the baseline is taken, so the first model's
+            # figures do not include the one-time cost of the libraries
+            import torch
+            from transformers import AutoTokenizer, AutoModelForCausalLM
+            rss_before = _resident_memory_bytes()
+            started = time.perf_counter()
+            if device == "cpu":
+                configure_torch_threads(TORCH_NUM_THREADS, TORCH_INTEROP_THREADS)
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            load_kwargs = {"torch_dtype": dtype}
+            if dtype != "auto":
+                load_kwargs["torch_dtype"] = getattr(torch, dtype)
+            # Plain CPU placement does not need accelerate's device maps
+            if device != "cpu":
+                load_kwargs["device_map"] = device
+            model = AutoModelForCausalLM.from_pretrained(model_name, **load_kwargs)
+            model.eval()
+            if quantization == "int8":
+                model = quantize_int8(model)
+        except Exception as e:
+            print(f"Could not load local model: {e}")
+            self._failures[key] = str(e)
+            return None
+
+        load_seconds = time.perf_counter() - started
+        memory_bytes = max(_resident_memory_bytes() - rss_before, 0)
+        loaded = LoadedModel(key, tokenizer, model, load_seconds, memory_bytes)
+        self._models[key] = loaded
+        return loaded
+
+    def release(self, loaded):
+        """Mark that a session no longer uses a model (weights stay cached)"""
+        if loaded is None:
+            return
+        with self._lock:
+            loaded.sessions = max(loaded.sessions - 1, 0)
+
+    def stats(self):
+        """Load time, resident memory and session count for every cached model"""
+        with self._lock:
+            models = list(self._models.values())
+            failures = dict(self._failures)
+        return {
+            "process_rss_bytes": _resident_memory_bytes(),
+            "models": [loaded.stats() for loaded in models],
+            "failures": {"/".join(key): error for key, error in failures.items()},
+        }
+
+    def clear(self):
+        """Drop every cached model so its weights can be freed"""
+        with self._lock:
+            self._models.clear()
+            self._failures.clear()
+            self._key_locks.clear()
+
+
+# Shared by every ChatbotEngine in this process
+registry = ModelRegistry()
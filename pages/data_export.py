@@ -0,0 +1,45 @@
+import streamlit as st
+from export import EXPORT_FORMATS, EXPORT_TABLES, export_to_file, iter_export, iter_zip
+
+TABLE_LABELS = {
+    "mood_logs": "Mood logs",
+    "chat_history": "Chat history",
+    "crisis_alerts": "Crisis alerts",
+    "therapy_progress": "Therapy progress"
+}
+
+def show_data_export(user_id):
+    """Display full-history data export"""
+    st.title("Export Your Data")
+    st.write("Download everything you have stored in the app. Exports cover your full history.")
+    st.caption("The file is prepared in full before the download starts; zipping keeps it small.")
+    
+    tables = st.multiselect(
+        "Data to export:",
+        list(EXPORT_TABLES),
+        default=list(EXPORT_TABLES),
+        format_func=TABLE_LABELS.get
+    )
+    fmt = st.radio("Format:", list(EXPORT_FORMATS), format_func=str.upper, horizontal=True)
+    zipped = st.checkbox("Compress as zip", value=True)
+    
+    if len(tables) > 1 and not zipped:
+        st.info("Several tables are always exported as a zip archive.")
+        zipped = True
+    
+    if st.button("Prepare Export", disabled=not tables):
+        # Rows are read in fixed-size chunks and spooled, not held as a
+        # DataFrame, but st.download_button serves the finished file from memory
+        if zipped:
+            chunks = iter_zip(user_id, tables, fmt)
+            file_name, mime = "my_data.zip", "application/zip"
+        else:
+            chunks = iter_export(tables[0], user_id, fmt)
+            file_name, mime = f"{tables[0]}.{fmt}", EXPORT_FORMATS[fmt]
+        
+        st.download_button(
+            label=f"Download {file_name}",
+            data=export_to_file(chunks),
+            file_name=file_name,
+            mime=mime
+        )
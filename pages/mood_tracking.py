@@ -3,7 +3,60 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from database import save_mood_log, get_mood_history
+from database import (
+    save_mood_log, get_mood_history, get_mood_stats, get_mood_distribution, get_mood_daily_series,
+    get_mood_data_version
+)
+from export import export_to_file, iter_export
+from view_cache import mood_view_cache
+
+# Chart ranges offered on the analytics section, in days (None = all time)
+CHART_RANGES = {
+    "Last 30 days": 30,
+    "Last 90 days": 90,
+    "Last year": 365,
+    "All time": None
+}
+
+def _build_summary(user_id):
+    """Statistics and the mood distribution figure over all entries"""
+    mood_counts = get_mood_distribution(user_id)
+    fig_pie = px.pie(
+        values=[count for _, count in mood_counts],
+        names=[mood for mood, _ in mood_counts],
+        title="Mood Distribution"
+    )
+    return {"stats": get_mood_stats(user_id), "fig_pie": fig_pie}
+
+def _build_trend(user_id, since_day):
+    """Average intensity per day since since_day, with the day's range on hover"""
+    daily_df = pd.DataFrame(
+        get_mood_daily_series(user_id, since_day),
+        columns=["Date", "Entries", "Intensity", "Lowest", "Highest"]
+    )
+    daily_df["Date"] = pd.to_datetime(daily_df["Date"])
+    fig_line = px.line(
+        daily_df,
+        x="Date",
+        y="Intensity",
+        hover_data=["Entries", "Lowest", "Highest"],
+        title="Mood Intensity Over Time",
+        labels={"Intensity": "Average Intensity (1-10)", "Date": "Date"}
+    )
+    fig_line.update_layout(hovermode="x unified")
+    return fig_line
+
+def _build_recent(user_id):
+    """Recent entry cards, read from the raw log"""
+    df = pd.DataFrame(get_mood_history(user_id), columns=["Mood", "Intensity", "Timestamp"])
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    cards = "".join(f"""
+                <div class="mood-card">
+                    <strong>{row['Mood']}</strong> - Intensity: {row['Intensity']}/10
+                    <br><small>{row['Timestamp'].strftime('%Y-%m-%d %H:%M')}</small>
+                </div>
+            """ for _, row in df.head(10).iterrows())
+    return {"cards": cards}
 
 def show_mood_tracking(user_id, language):
     """Display mood tracking interface"""
@@ -60,79 +113,64 @@ def show_mood_tracking(user_id, language):
     # Analytics section
     st.subheader("Your Mood Analytics")
     
-    mood_history = get_mood_history(user_id)
+    # Derived views are rebuilt only when this user's mood data changes;
+    # other widget interactions are served from the shared cache
+    version = get_mood_data_version(user_id)
+    summary = mood_view_cache.get_or_build(
+        ("summary", user_id, version), lambda: _build_summary(user_id)
+    )
+    total_entries, avg_intensity, min_intensity, max_intensity = summary["stats"]
     
-    if mood_history:
-        # Convert to DataFrame
-        df = pd.DataFrame(mood_history, columns=["Mood", "Intensity", "Timestamp"])
-        df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+    if total_entries:
+        range_label = st.selectbox("Chart range:", list(CHART_RANGES), key="mood_chart_range")
+        range_days = CHART_RANGES[range_label]
+        since_day = None
+        if range_days is not None:
+            since_day = (datetime.utcnow() - timedelta(days=range_days - 1)).strftime("%Y-%m-%d")
+        fig_line = mood_view_cache.get_or_build(
+            ("trend", user_id, version, since_day), lambda: _build_trend(user_id, since_day)
+        )
         
         # Create visualizations
         col1, col2 = st.columns(2)
         
         with col1:
-            # Mood intensity over time
-            fig_line = px.line(
-                df.sort_values("Timestamp"),
-                x="Timestamp",
-                y="Intensity",
-                title="Mood Intensity Over Time",
-                labels={"Intensity": "Intensity (1-10)", "Timestamp": "Date"}
-            )
-            fig_line.update_layout(hovermode="x unified")
             st.plotly_chart(fig_line, use_container_width=True)
         
         with col2:
-            # Mood distribution
-            mood_counts = df["Mood"].value_counts()
-            fig_pie = px.pie(
-                values=mood_counts.values,
-                names=mood_counts.index,
-                title="Mood Distribution"
-            )
-            st.plotly_chart(fig_pie, use_container_width=True)
+            st.plotly_chart(summary["fig_pie"], use_container_width=True)
         
         # Statistics
         st.subheader("Statistics")
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            avg_intensity = df["Intensity"].mean()
             st.metric("Average Intensity", f"{avg_intensity:.1f}/10")
         
         with col2:
-            max_intensity = df["Intensity"].max()
             st.metric("Peak Intensity", f"{max_intensity}/10")
         
         with col3:
-            min_intensity = df["Intensity"].min()
             st.metric("Lowest Intensity", f"{min_intensity}/10")
         
         with col4:
-            total_entries = len(df)
             st.metric("Total Entries", total_entries)
         
+        recent = mood_view_cache.get_or_build(("recent", user_id, version), lambda: _build_recent(user_id))
+        
         # Recent entries
         st.subheader("Recent Mood Entries")
-        recent_df = df.sort_values("Timestamp", ascending=False).head(10)
+        st.markdown(recent["cards"], unsafe_allow_html=True)
         
-        for idx, row in recent_df.iterrows():
-            st.markdown(f"""
-                <div class="mood-card">
-                    <strong>{row['Mood']}</strong> - Intensity: {row['Intensity']}/10
-                    <br><small>{row['Timestamp'].strftime('%Y-%m-%d %H:%M')}</small>
-                </div>
-            """, unsafe_allow_html=True)
-        
-        # Export data
+        # Export data: the full history, read from the database only on request
         st.subheader("Export Your Data")
-        csv = df.to_csv(index=False)
-        st.download_button(
-            label="Download Mood History as CSV",
-            data=csv,
-            file_name="mood_history.csv",
-            mime="text/csv"
-        )
+        if st.button("Prepare Mood History CSV"):
+            st.download_button(
+                label="Download Mood History as CSV",
+                data=export_to_file(iter_export("mood_logs", user_id)),
+                file_name="mood_history.csv",
+                mime="text/csv"
+            )
     
     else:
         st.info("No mood entries yet. Start tracking your mood to see analytics!")
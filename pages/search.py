@@ -0,0 +1,51 @@
+import streamlit as st
+from search import highlight_html, search_chat_history, search_mood_notes
+
+def show_search(user_id):
+    """Display full-text search over the user's conversations and mood notes"""
+    st.title("Search Your History")
+    
+    text = st.text_input("Search for:", placeholder="e.g. exams, sleep, चिंता")
+    scope = st.radio("Search in:", ["Conversations", "Mood notes"], horizontal=True)
+    
+    # Start from the first page whenever the query or scope changes
+    if st.session_state.get("search_key") != (text, scope):
+        st.session_state.search_key = (text, scope)
+        st.session_state.search_page = 0
+    page = st.session_state.search_page
+    
+    if not text.strip():
+        return
+    
+    if scope == "Conversations":
+        results, has_more = search_chat_history(user_id, text, page)
+        for _, message, response, timestamp in results:
+            st.markdown(f"""
+                <div class="chat-message user-message">
+                    <strong>You:</strong> {highlight_html(message)}
+                </div>
+                <div class="chat-message bot-message">
+                    <strong>Support Bot:</strong> {highlight_html(response)}
+                </div>
+            """, unsafe_allow_html=True)
+            st.caption(timestamp)
+    else:
+        results, has_more = search_mood_notes(user_id, text, page)
+        for _, mood, intensity, notes, timestamp in results:
+            st.markdown(f"**{mood}** ({intensity}/10): {highlight_html(notes)}", unsafe_allow_html=True)
+            st.caption(timestamp)
+    
+    if not results and page == 0:
+        st.info("No matches found.")
+    
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        if st.button("Previous", disabled=page == 0):
+            st.session_state.search_page -= 1
+            st.rerun()
+    with col2:
+        if st.button("Next", disabled=not has_more):
+            st.session_state.search_page += 1
+            st.rerun()
+    with col3:
+        st.caption(f"Page {page + 1}")
@@ -0,0 +1,41 @@
+"""Move old chat turns into the compressed archive database
+
+Run periodically (e.g. daily from cron). Safe to re-run or interrupt:
+turns are merged into their monthly segments by id before they are
+deleted from the hot database.
+
+Usage: python scripts/archive_chat_history.py [--older-than-days 180] [--vacuum]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archive import archive_chat_history, archive_stats
+from config import ARCHIVE_AFTER_DAYS
+from db_pool import pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--codec", choices=["zstd", "zlib"])
+    parser.add_argument("--vacuum", action="store_true", help="compact the hot database afterwards")
+    args = parser.parse_args()
+
+    result = archive_chat_history(args.older_than_days, codec=args.codec)
+    print(f"archived {result['turns']} turns older than {result['cutoff']} into {result['segments']} segment writes")
+    if args.vacuum and result["turns"]:
+        # Deleted rows only free pages inside the file; VACUUM returns them to the OS
+        with pool.connection() as conn:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    stats = archive_stats()
+    ratio = f"{stats['ratio']:.1f}x" if stats["ratio"] else "-"
+    print(f"archive: {stats['segments']} segments, {stats['turns']} turns, "
+          f"{stats['raw_bytes'] / 1e6:.1f} MB raw, {stats['stored_bytes'] / 1e6:.1f} MB stored ({ratio})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Hot database size and history paging latency before and after archiving
+
+Usage: python scripts/bench_archive.py [--users 100] [--months 12] [--turns-per-month 60]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench_archive_")
+os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "hot.db")
+os.environ["ARCHIVE_DATABASE_PATH"] = os.path.join(WORKDIR, "archive.db")
+
+import archive
+import database
+from db_pool import pool
+
+REPLIES = [
+    "That sounds really difficult. What do you think is making it feel so heavy right now?",
+    "It makes sense to feel anxious before a big change. Would a short breathing exercise help?",
+    "Thank you for sharing that with me. How have you been sleeping this week?",
+    "You are not alone in this. Is there someone you trust you could talk to today?",
+]
+
+
+def populate(users, months, turns_per_month):
+    rng = random.Random(7)
+    rows = []
+    for month in range(months):
+        year, month_of_year = 2024 + month // 12, month % 12 + 1
+        for user_id in range(1, users + 1):
+            for turn in range(turns_per_month):
+                day = 1 + turn * 27 // turns_per_month
+                rows.append((
+                    f"{year}-{month_of_year:02d}-{day:02d} {rng.randint(0, 23):02d}:00:00",
+                    user_id, f"Turn {turn}: I keep worrying about work and cannot switch off.",
+                    rng.choice(REPLIES)
+                ))
+    rows.sort()
+    with pool.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO chat_history (timestamp, user_id, message, response) VALUES (?, ?, ?, ?)", rows
+        )
+    return len(rows)
+
+
+def database_mb(db_pool):
+    # Logical size, independent of how far the WAL has been checkpointed
+    with db_pool.connection() as conn:
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    return page_count * page_size / 1e6
+
+
+def page_latency_ms(user_ids, pages):
+    """Median time per page when paging back through each user's history"""
+    samples = []
+    for user_id in user_ids:
+        cursor = None
+        for _ in range(pages):
+            started = time.perf_counter()
+            _, cursor = database.get_chat_history_page(user_id, cursor, 20)
+            samples.append(time.perf_counter() - started)
+            if cursor is None:
+                break
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--turns-per-month", type=int, default=60)
+    args = parser.parse_args()
+
+    database.init_database()
+    turns = populate(args.users, args.months, args.turns_per_month)
+    sample_users = list(range(1, min(args.users, 20) + 1))
+    all_pages = args.months * args.turns_per_month // 20 + 1
+
+    before_mb = database_mb(pool)
+    before_ms = page_latency_ms(sample_users, all_pages)
+    # Everything but the newest generated month goes to the archive
+    newest_month = datetime(2024 + (args.months - 1) // 12, (args.months - 1) % 12 + 1, 1, tzinfo=timezone.utc)
+    started = time.perf_counter()
+    result = archive.archive_chat_history(older_than_days=(datetime.now(timezone.utc) - newest_month).days)
+    archive_seconds = time.perf_counter() - started
+    with pool.connection() as conn:
+        conn.execute("VACUUM")
+
+    cold_ms = page_latency_ms(sample_users, all_pages)
+    warm_ms = page_latency_ms(sample_users, all_pages)
+    stats = archive.archive_stats()
+    print(f"{turns} turns, {args.users} users, {args.months} months; archived {result['turns']} "
+          f"in {archive_seconds:.1f}s into {stats['segments']} segments ({stats['ratio']:.1f}x compression)")
+    print(f"{'':>22} {'hot MB':>8} {'archive MB':>11} {'page ms':>8}")
+    print(f"{'before':>22} {before_mb:>8.1f} {0:>11.1f} {before_ms:>8.2f}")
+    print(f"{'after (segment miss)':>22} {database_mb(pool):>8.1f} "
+          f"{database_mb(archive.archive_pool):>11.1f} {cold_ms:>8.2f}")
+    print(f"{'after (segment cached)':>22} {'':>8} {'':>11} {warm_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
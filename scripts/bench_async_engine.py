@@ -0,0 +1,83 @@
+"""Concurrent API-backed conversations on a single event loop
+
+Each conversation runs crisis detection, generation and the chat-history
+write with the async API against the local stub in scripts/stub_server.py,
+which adds a fixed delay per completion.
+
+Usage: python scripts/bench_async_engine.py [--conversations 10 100 300] [--turns 3] [--delay 0.2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer
+
+WORKDIR = tempfile.mkdtemp(prefix="bench_async_")
+os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "async.db")
+os.environ["CRISIS_ALERT_WAL_PATH"] = os.path.join(WORKDIR, "alerts.wal")
+
+
+async def conversation(chatbot, database, detector, user_id, turns, latencies):
+    engine = chatbot.ChatbotEngine("en")
+    for turn in range(turns):
+        message = f"conversation {user_id} turn {turn}"
+        started = time.perf_counter()
+        crisis, response = await asyncio.gather(
+            detector.adetect_crisis(message),
+            engine.agenerate_response(message)
+        )
+        if crisis:
+            await detector.alog_alert(user_id, message)
+        await database.asave_chat_message(user_id, message, response)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(chatbot, database, detector, conversations, turns):
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        conversation(chatbot, database, detector, user_id, turns, latencies)
+        for user_id in range(conversations)
+    ))
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, nargs="+", default=[10, 100, 300])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--delay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with StubServer(reply="I'm here to listen. Tell me more.", delay=args.delay) as server:
+        os.environ["API_KEY"] = "bench"
+        os.environ["API_BASE_URL"] = server.url
+        os.environ["ROUTER_HEDGE_AFTER_MS"] = "30000"
+        os.environ["ROUTER_TURN_SLO_MS"] = "30000"
+
+        import chatbot
+        import database
+        from backend_router import BackendRouter
+        from crisis_detection import CrisisDetector
+
+        database.init_database()
+        detector = CrisisDetector("en")
+        print(f"api delay {args.delay * 1000:.0f} ms, httpx: {chatbot.HTTPX_AVAILABLE}")
+        print(f"{'convs':>6} {'turns/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'threads':>8}")
+        for conversations in args.conversations:
+            chatbot.router = BackendRouter()
+            elapsed, latencies = asyncio.run(run(chatbot, database, detector, conversations, args.turns))
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+            print(f"{conversations:>6} {len(latencies) / elapsed:>8.1f} {p50:>8.1f} {p99:>8.1f} {threading.active_count():>8}")
+            print(f"       router: {chatbot.router.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Logins/sec and latency percentiles under concurrent sign-ins
+
+Usage: python scripts/bench_auth.py [--concurrency 1 4 16 64] [--logins 64] [--rounds 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench_auth_")
+os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "auth.db")
+os.environ["BCRYPT_ROUNDS_PATH"] = os.path.join(WORKDIR, "bcrypt_rounds")
+
+import auth
+import database
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run(concurrency, logins, users):
+    latencies = []
+    busy = []
+    failed = []
+    barrier = threading.Barrier(concurrency)
+
+    def session(index):
+        barrier.wait()
+        for turn in range(logins // concurrency or 1):
+            username = users[(index + turn) % len(users)]
+            started = time.perf_counter()
+            try:
+                if not auth.authenticate_user(username, "password123"):
+                    failed.append(username)
+            except auth.AuthBusyError:
+                busy.append(username)
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, latencies, len(busy), len(failed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=0, help="bcrypt cost, 0 to calibrate")
+    args = parser.parse_args()
+
+    database.init_database()
+    rounds = args.rounds or auth.calibrate_bcrypt_cost()
+    auth._bcrypt_rounds = rounds
+    users = [f"bench_user_{i}" for i in range(16)]
+    for username in users:
+        auth.create_user(username, "password123", f"{username}@example.com")
+
+    print(f"bcrypt cost {rounds}, {auth.AUTH_HASH_WORKERS} workers, queue depth {auth.AUTH_HASH_QUEUE_DEPTH}")
+    print(f"{'sessions':>8} {'logins/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'busy':>5} {'failed':>7}")
+    for concurrency in args.concurrency:
+        rate, latencies, busy, failed = run(concurrency, args.logins, users)
+        p50 = percentile(latencies, 0.50) * 1000 if latencies else 0
+        p99 = percentile(latencies, 0.99) * 1000 if latencies else 0
+        print(f"{concurrency:>8} {rate:>9.1f} {p50:>8.1f} {p99:>8.1f} {busy:>5} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Time to first chunk through the backend router with a healthy, slow and failing API
+
+Runs ChatbotEngine against the local stub in scripts/stub_server.py and
+reports, per scenario, first-chunk latency, which backend answered, and
+the router's per-backend stats and breaker state.
+
+Usage: python scripts/bench_backend_router.py [--turns 20] [--hedge-ms 300] [--slow-s 2]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer
+
+
+def run_turns(chatbot_module, engine, turns):
+    latencies = []
+    for turn in range(turns):
+        started = time.perf_counter()
+        stream = engine.stream_response(f"message {turn}")
+        next(stream)
+        latencies.append(time.perf_counter() - started)
+        for _ in stream:
+            pass
+    decisions = chatbot_module.router.decisions(limit=turns)
+    return sorted(latencies), Counter(decision["winner"] for decision in decisions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--hedge-ms", type=float, default=300)
+    parser.add_argument("--slow-s", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with StubServer(reply="I'm here to listen. Tell me more about how you feel.") as server:
+        os.environ["API_KEY"] = "bench"
+        os.environ["API_BASE_URL"] = server.url
+        os.environ["API_MAX_RETRIES"] = "1"
+        os.environ["API_RETRY_BACKOFF"] = "0"
+
+        import chatbot
+        from backend_router import BackendRouter
+
+        scenarios = [
+            ("healthy api", 0.0, 0),
+            ("slow api", args.slow_s, 0),
+            ("failing api (429)", 0.0, 1),
+        ]
+        print(f"hedge after {args.hedge_ms:.0f} ms, slow api delay {args.slow_s:.1f} s")
+        print(f"{'scenario':<18} {'p50 ms':>8} {'p99 ms':>8}  winners")
+        for label, delay, throttle_every in scenarios:
+            server.delay = delay
+            server.throttle_every = throttle_every
+            chatbot.router = BackendRouter(hedge_after_ms=args.hedge_ms, turn_slo_ms=args.hedge_ms * 2)
+            engine = chatbot.ChatbotEngine("en")
+            latencies, winners = run_turns(chatbot, engine, args.turns)
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+            print(f"{label:<18} {p50:>8.1f} {p99:>8.1f}  {dict(winners)}")
+            for name, stats in chatbot.router.stats().items():
+                print(f"    {name:<9} {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Compare int8 dynamic quantization with the float32 baseline on CPU
+
+Reports weight size, prefill latency and greedy decode speed at each
+thread count, plus quality against the float model: perplexity on
+reference texts, next-token (top-1) agreement and how many greedy tokens
+match before the first divergence.
+
+Usage: python scripts/bench_cpu_inference.py [--model NAME] [--threads 1 2 4] [--max-new-tokens 32]
+"""
+import argparse
+import io
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from model_registry import configure_torch_threads, registry
+
+PROMPT = "User: I have been feeling anxious about work lately and cannot sleep.\n\nAssistant:"
+
+REFERENCE_TEXTS = [
+    "It is normal to feel anxious before a big change. Try to notice the thought, "
+    "name the feeling, and take a few slow breaths before deciding what to do next.",
+    "Sleep tends to improve when you keep a regular bedtime, avoid screens for an hour "
+    "before bed and write down worries so they do not keep circling in your mind.",
+    "If you ever feel unsafe or think about harming yourself, please contact a crisis "
+    "helpline or someone you trust right away. You do not have to face it alone.",
+]
+
+
+def weight_megabytes(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1e6
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def greedy(loaded, input_ids, max_new_tokens):
+    output = loaded.model.generate(
+        input_ids=input_ids,
+        attention_mask=torch.ones_like(input_ids),
+        max_new_tokens=max_new_tokens,
+        min_new_tokens=max_new_tokens,
+        do_sample=False,
+        pad_token_id=loaded.tokenizer.eos_token_id,
+    )
+    return output[0, input_ids.shape[1]:].tolist()
+
+
+def latency(loaded, input_ids, max_new_tokens, repeat):
+    with torch.inference_mode():
+        greedy(loaded, input_ids, 2)  # warm up
+        prefill, _ = timed(lambda: loaded.model(input_ids=input_ids).logits, repeat)
+        decode, tokens = timed(lambda: greedy(loaded, input_ids, max_new_tokens), repeat)
+    return prefill, len(tokens) / decode
+
+
+def reference_logits(loaded):
+    with torch.inference_mode():
+        return [
+            loaded.model(input_ids=loaded.tokenizer(text, return_tensors="pt")["input_ids"]).logits[0]
+            for text in REFERENCE_TEXTS
+        ]
+
+
+def perplexity(loaded, logits):
+    losses = []
+    for text, text_logits in zip(REFERENCE_TEXTS, logits):
+        labels = loaded.tokenizer(text, return_tensors="pt")["input_ids"][0]
+        losses.append(torch.nn.functional.cross_entropy(text_logits[:-1], labels[1:]).item())
+    return math.exp(statistics.mean(losses))
+
+
+def top1_agreement(logits, baseline_logits):
+    matches = total = 0
+    for text_logits, base in zip(logits, baseline_logits):
+        matches += (text_logits.argmax(-1) == base.argmax(-1)).sum().item()
+        total += base.shape[0]
+    return matches / total
+
+
+def matching_prefix(tokens, baseline_tokens):
+    for index, (token, base) in enumerate(zip(tokens, baseline_tokens)):
+        if token != base:
+            return index
+    return min(len(tokens), len(baseline_tokens))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="HuggingFaceTB/SmolLM-135M")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    models = {}
+    for quantization in ("none", "int8"):
+        started = time.perf_counter()
+        loaded = registry.get(args.model, "float32", "cpu", quantization)
+        if loaded is None:
+            sys.exit(f"Could not load {args.model}")
+        models[quantization] = (loaded, time.perf_counter() - started)
+
+    baseline = models["none"][0]
+    input_ids = baseline.tokenizer(PROMPT, return_tensors="pt")["input_ids"]
+    baseline_logits = reference_logits(baseline)
+    with torch.inference_mode():
+        baseline_tokens = greedy(baseline, input_ids, args.max_new_tokens)
+
+    print(f"{'mode':>6} {'load s':>7} {'weights MB':>11} {'ppl':>8} {'top-1':>7} {'greedy match':>13}")
+    for quantization, (loaded, load_seconds) in models.items():
+        logits = reference_logits(loaded)
+        with torch.inference_mode():
+            tokens = greedy(loaded, input_ids, args.max_new_tokens)
+        print(f"{quantization:>6} {load_seconds:>7.2f} {weight_megabytes(loaded.model):>11.1f} "
+              f"{perplexity(loaded, logits):>8.2f} {top1_agreement(logits, baseline_logits):>7.1%} "
+              f"{matching_prefix(tokens, baseline_tokens):>6}/{len(baseline_tokens):<6}")
+
+    print()
+    print(f"{'mode':>6} {'threads':>8} {'prefill ms':>11} {'decode tok/s':>13}")
+    for threads in args.threads:
+        configure_torch_threads(threads)
+        for quantization, (loaded, _) in models.items():
+            prefill, tokens_per_sec = latency(loaded, input_ids, args.max_new_tokens, args.repeat)
+            print(f"{quantization:>6} {threads:>8} {prefill * 1000:>11.1f} {tokens_per_sec:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Microbenchmark the crisis keyword automaton against the old linear scan
+
+Usage: python scripts/bench_crisis_matcher.py [--keywords 10 100 1000 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CRISIS_KEYWORDS
+from keyword_matcher import KeywordMatcher
+
+MESSAGES = [
+    "I have been feeling really low lately and work keeps piling up on me.",
+    "मुझे आज बहुत चिंता हो रही है और मैं सो नहीं पा रहा हूँ।",
+    "Started a new diet and studied for exams all week, feeling tired.",
+    "माझ्या मनात खूप गोंधळ आहे, काय करावे कळत नाही.",
+] * 25
+
+
+def linear_scan(keywords, message):
+    """The detector's original loop: lowercase and substring test each keyword"""
+    message_lower = message.lower()
+    for keyword in keywords:
+        if keyword.lower() in message_lower:
+            return True
+    return False
+
+
+def synthetic_keywords(count):
+    rng = random.Random(0)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    phrases = [kw for keywords in CRISIS_KEYWORDS.values() for kw in keywords]
+    while len(phrases) < count:
+        words = ["".join(rng.choice(alphabet) for _ in range(rng.randint(4, 9))) for _ in range(rng.randint(1, 3))]
+        phrases.append(" ".join(words))
+    return phrases[:count]
+
+
+def time_per_message(fn, repeat=5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for message in MESSAGES:
+            fn(message)
+    return (time.perf_counter() - started) / (repeat * len(MESSAGES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keywords", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    args = parser.parse_args()
+
+    print(f"{'keywords':>8} {'linear us':>10} {'automaton us':>13} {'build ms':>9}")
+    for count in args.keywords:
+        keywords = synthetic_keywords(count)
+        started = time.perf_counter()
+        matcher = KeywordMatcher({"bench": keywords})
+        build = time.perf_counter() - started
+        linear = time_per_message(lambda message: linear_scan(keywords, message))
+        automaton = time_per_message(matcher.search)
+        print(f"{count:>8} {linear * 1e6:>10.1f} {automaton * 1e6:>13.1f} {build * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
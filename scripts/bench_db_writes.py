@@ -0,0 +1,107 @@
+"""Writes/sec under concurrent sessions: connect-per-call, pooled WAL and write-behind
+
+Usage: python scripts/bench_db_writes.py [--sessions 1 4 16] [--writes 200]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench_db_")
+os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "pooled.db")
+
+import database
+from db_pool import pool
+from db_writer import get_db_writer
+from migrations import run_migrations
+
+LEGACY_PATH = os.path.join(WORKDIR, "legacy.db")
+
+
+def legacy_save_chat_message(user_id, message, response, language="en"):
+    """save_chat_message as it was: new rollback-journal connection per call"""
+    conn = sqlite3.connect(LEGACY_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO chat_history (user_id, message, response, language)
+        VALUES (?, ?, ?, ?)
+    """, (user_id, message, response, language))
+    conn.commit()
+    conn.close()
+
+
+def pooled_save_chat_message(user_id, message, response, language="en"):
+    """One pooled transaction per message, as before write-behind"""
+    with pool.transaction() as conn:
+        conn.execute("""
+            INSERT INTO chat_history (user_id, message, response, language)
+            VALUES (?, ?, ?, ?)
+        """, (user_id, message, response, language))
+
+
+def legacy_get_mood_history(user_id, limit=30):
+    conn = sqlite3.connect(LEGACY_PATH)
+    results = conn.execute("""
+        SELECT mood, intensity, timestamp FROM mood_logs
+        WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?
+    """, (user_id, limit)).fetchall()
+    conn.close()
+    return results
+
+
+def run(save, read, sessions, writes):
+    errors = []
+
+    def session(user_id):
+        for turn in range(writes):
+            try:
+                save(user_id, f"message {turn}", f"response {turn}")
+                # Sessions also read while others write, as the pages do
+                if turn % 4 == 0:
+                    read(user_id)
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(user_id,)) for user_id in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Write-behind rows only count once they are committed
+    get_db_writer().flush()
+    elapsed = time.perf_counter() - started
+    return (sessions * writes - len(errors)) / elapsed, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    database.init_database()
+    legacy = sqlite3.connect(LEGACY_PATH)
+    run_migrations(legacy)
+    legacy.close()
+
+    print(f"database files in {WORKDIR}")
+    print(f"{'sessions':>8} {'legacy w/s':>11} {'errors':>7} {'pooled w/s':>11} {'errors':>7} "
+          f"{'buffered w/s':>13} {'errors':>7}")
+    for sessions in args.sessions:
+        legacy_rate, legacy_errors = run(legacy_save_chat_message, legacy_get_mood_history, sessions, args.writes)
+        pooled_rate, pooled_errors = run(pooled_save_chat_message, database.get_mood_history, sessions, args.writes)
+        buffered_rate, buffered_errors = run(database.save_chat_message, database.get_mood_history, sessions, args.writes)
+        print(f"{sessions:>8} {legacy_rate:>11.0f} {legacy_errors:>7} {pooled_rate:>11.0f} {pooled_errors:>7} "
+              f"{buffered_rate:>13.0f} {buffered_errors:>7}")
+    print(f"pool: {database.pool.stats()}")
+    print(f"writer: {get_db_writer().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare pooled keep-alive requests with one-shot requests against a local stub
+
+Usage: python scripts/bench_http_client.py [--requests 200] [--threads 8]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from http_client import build_session, post_json
+from stub_server import StubServer
+
+PAYLOAD = {"model": "stub", "messages": [{"role": "user", "content": "hello"}]}
+
+
+def run(post, total, threads):
+    per_thread = total // threads
+    statuses = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(per_thread):
+            status = post().status_code
+            with lock:
+                statuses.append(status)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return elapsed, statuses
+
+
+def report(label, server, elapsed, statuses):
+    ok = statuses.count(200)
+    print(f"{label:<22} {len(statuses) / elapsed:>9.1f} req/s  "
+          f"{elapsed / len(statuses) * 1000:>7.2f} ms/req  "
+          f"connections={server.counters['connections']:<5} "
+          f"ok={ok}/{len(statuses)} throttled={server.counters['throttled']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--throttle-every", type=int, default=5)
+    args = parser.parse_args()
+
+    with StubServer() as server:
+        url = f"{server.url}/chat/completions"
+        elapsed, statuses = run(
+            lambda: requests.post(url, json=PAYLOAD, headers={"Connection": "close"}, timeout=5),
+            args.requests, args.threads
+        )
+        report("one-shot requests", server, elapsed, statuses)
+
+    with StubServer() as server:
+        url = f"{server.url}/chat/completions"
+        session = build_session(pool_size=args.threads, max_retries=0)
+        elapsed, statuses = run(lambda: post_json(url, PAYLOAD, session=session), args.requests, args.threads)
+        report("pooled keep-alive", server, elapsed, statuses)
+
+    with StubServer(throttle_every=args.throttle_every) as server:
+        url = f"{server.url}/chat/completions"
+        session = build_session(pool_size=args.threads, backoff=0.01)
+        elapsed, statuses = run(lambda: post_json(url, PAYLOAD, session=session), args.requests, args.threads)
+        report("pooled + throttling", server, elapsed, statuses)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark the batching inference worker at several concurrency levels
+
+Usage: python scripts/bench_inference_server.py [--model NAME] [--concurrency 1 4 16]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_server import InferenceWorker
+from model_registry import registry
+
+PROMPT = "User: I have been feeling anxious about work lately.\n\nAssistant:"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def run_level(loaded, sessions, turns, max_new_tokens):
+    worker = InferenceWorker(loaded, max_batch_size=max(sessions, 1))
+    latencies = []
+    tokens = []
+    lock = threading.Lock()
+
+    def session():
+        for _ in range(turns):
+            request = worker.submit(PROMPT, max_new_tokens=max_new_tokens)
+            request.result()
+            with lock:
+                latencies.append(request.finished_at - request.submitted_at)
+                tokens.append(request.generated_tokens)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "sessions": sessions,
+        "tokens_per_sec": sum(tokens) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "avg_batch": worker.stats()["average_batch_size"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="sshleifer/tiny-gpt2")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    loaded = registry.get(args.model, "float32", "cpu")
+    if loaded is None:
+        sys.exit(f"Could not load {args.model}")
+
+    print(f"{'sessions':>8} {'tok/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'batch':>7}")
+    for sessions in args.concurrency:
+        result = run_level(loaded, sessions, args.turns, args.max_new_tokens)
+        print(f"{result['sessions']:>8} {result['tokens_per_sec']:>10.1f} "
+              f"{result['p50_ms']:>10.1f} {result['p99_ms']:>10.1f} {result['avg_batch']:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
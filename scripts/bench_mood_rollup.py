@@ -0,0 +1,92 @@
+"""Mood analytics cost: aggregating raw mood_logs vs reading mood_daily_rollup
+
+Usage: python scripts/bench_mood_rollup.py [--entries 1000 10000 100000] [--per-day 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_mood_"), "mood.db")
+
+import database
+from db_pool import pool
+
+MOODS = ["Excellent", "Good", "Neutral", "Poor", "Terrible"]
+
+
+def raw_analytics(user_id):
+    """Stats, distribution and daily series straight from mood_logs"""
+    with pool.connection() as conn:
+        conn.execute("""
+            SELECT COUNT(*), AVG(intensity), MIN(intensity), MAX(intensity)
+            FROM mood_logs WHERE user_id = ?
+        """, (user_id,)).fetchone()
+        conn.execute("""
+            SELECT mood, COUNT(*) FROM mood_logs WHERE user_id = ? GROUP BY mood
+        """, (user_id,)).fetchall()
+        conn.execute("""
+            SELECT date(timestamp), COUNT(*), AVG(intensity), MIN(intensity), MAX(intensity)
+            FROM mood_logs WHERE user_id = ? GROUP BY date(timestamp) ORDER BY 1
+        """, (user_id,)).fetchall()
+
+
+def rollup_analytics(user_id):
+    database.get_mood_stats(user_id)
+    database.get_mood_distribution(user_id)
+    database.get_mood_daily_series(user_id)
+
+
+def best_of(fn, user_id, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(user_id)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--per-day", type=int, default=5)
+    args = parser.parse_args()
+
+    database.init_database()
+    rng = random.Random(0)
+    start = datetime(2020, 1, 1)
+
+    print(f"{'entries':>8} {'days':>6} {'raw ms':>8} {'rollup ms':>10}")
+    for user_id, entries in enumerate(args.entries, start=1):
+        for i in range(entries):
+            database.save_mood_log(user_id, rng.choice(MOODS), rng.randint(1, 10))
+        # Spread the entries over per-day days, then rebuild the rollup to match
+        with pool.transaction() as conn:
+            conn.executemany(
+                "UPDATE mood_logs SET timestamp = ? WHERE id = ?",
+                [
+                    ((start + timedelta(days=i // args.per_day, minutes=i)).strftime("%Y-%m-%d %H:%M:%S"), row_id)
+                    for i, (row_id,) in enumerate(conn.execute(
+                        "SELECT id FROM mood_logs WHERE user_id = ? ORDER BY id", (user_id,)
+                    ).fetchall())
+                ]
+            )
+            conn.execute("DELETE FROM mood_daily_rollup WHERE user_id = ?", (user_id,))
+            conn.execute("""
+                INSERT INTO mood_daily_rollup
+                    (user_id, day, mood, entry_count, intensity_sum, intensity_min, intensity_max)
+                SELECT user_id, date(timestamp), mood, COUNT(*), SUM(intensity), MIN(intensity), MAX(intensity)
+                FROM mood_logs WHERE user_id = ?
+                GROUP BY user_id, date(timestamp), mood
+            """, (user_id,))
+        days = -(-entries // args.per_day)
+        print(f"{entries:>8} {days:>6} {best_of(raw_analytics, user_id):>8.2f} {best_of(rollup_analytics, user_id):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare prefill time with and without the system-prompt prefix cache
+
+Usage: python scripts/bench_prefix_cache.py [--model NAME] [--turns 6] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="sshleifer/tiny-gpt2")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # The engine reads its model settings from the environment at import
+    os.environ.update(API_KEY="", MODEL_NAME=args.model, MODEL_DTYPE="float32", MODEL_DEVICE="cpu")
+    from chatbot import ChatbotEngine
+
+    engine = ChatbotEngine(args.language)
+    if engine.model is None:
+        sys.exit(f"Could not load {args.model}")
+    model = engine.model
+
+    # Render a realistic multi-turn prompt the same way the engine does
+    for turn in range(args.turns):
+        engine.conversation_history.append({"role": "user", "content": f"I have been anxious lately ({turn})."})
+        engine.conversation_history.append({"role": "assistant", "content": "That sounds hard. What helps you relax?"})
+    engine.conversation_history.append({"role": "user", "content": "Work is overwhelming this week."})
+    system_prompt = engine.get_system_prompt()
+    prompt = engine._build_local_prompt([{"role": "system", "content": system_prompt}] + engine.conversation_history)
+    input_ids, prefix_ids = engine._split_prefix(prompt, system_prompt)
+    if prefix_ids is None:
+        sys.exit("The rendered prompt has no cacheable system-prompt prefix")
+
+    full = torch.tensor([input_ids])
+    suffix = torch.tensor([input_ids[len(prefix_ids):]])
+    with torch.inference_mode():
+        past = model(input_ids=torch.tensor([prefix_ids]), use_cache=True).past_key_values
+        cold, full_logits = timed(lambda: model(input_ids=full).logits[:, -1], args.repeat)
+        warm, cached_logits = timed(
+            lambda: model(
+                input_ids=suffix,
+                past_key_values=past,
+                attention_mask=torch.ones_like(full)
+            ).logits[:, -1],
+            args.repeat
+        )
+
+    print(f"prompt tokens: {len(input_ids)} (prefix {len(prefix_ids)}, new {len(input_ids) - len(prefix_ids)})")
+    print(f"prefill without cache: {cold * 1000:.2f} ms")
+    print(f"prefill with cache:    {warm * 1000:.2f} ms ({cold / warm:.1f}x faster)")
+    print(f"max logit difference:  {(full_logits - cached_logits).abs().max().item():.2e}")
+
+
+if __name__ == "__main__":
+    main()
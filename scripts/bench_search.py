@@ -0,0 +1,144 @@
+"""Full-text search latency over a synthetic multilingual chat corpus
+
+Fills chat_history through the FTS triggers, then times ranked per-user
+searches for common and rare words against the LIKE scan they replace.
+
+Usage: python scripts/bench_search.py [--messages 1000000] [--users 2000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench_search_")
+os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "search.db")
+
+import database
+from db_pool import pool
+from search import search_chat_history
+
+ENGLISH = (
+    "i feel so tired anxious worried about work exams family sleep tonight today friends "
+    "lonely stressed better talk breathing exercise help really cannot stop thinking "
+    "again every morning night job parents college future panic calm heavy week"
+).split()
+HINDI = "मुझे बहुत चिंता हो रही है नींद नहीं आती परीक्षा काम परिवार दोस्त अकेला थकान डर आज रात".split()
+MARATHI = "मला खूप काळजी वाटते झोप येत नाही परीक्षा काम घरचे मित्र एकटे थकवा भीती आज रात्री".split()
+REPLY = "that sounds hard thank you for sharing how have you been sleeping would a short breathing exercise help".split()
+
+# (label, query) pairs; the rare words are planted in about one message in 5000
+QUERIES = [
+    ("common en", "work"),
+    ("two words en", "worried exams"),
+    ("stemmed en", "breathe"),
+    ("common hi", "चिंता"),
+    ("common mr", "काळजी"),
+    ("rare en", "insomnia"),
+    ("rare mr", "झोपमोड"),
+]
+RARE = ["insomnia", "झोपमोड"]
+
+
+def sentence(rng, vocabulary, length):
+    # Zipf-like word frequencies, so a few words are very common
+    return " ".join(rng.choices(vocabulary, weights=[1 / (rank + 1) for rank in range(len(vocabulary))], k=length))
+
+
+def populate(messages, users, chunk=50000):
+    rng = random.Random(11)
+    languages = [(ENGLISH, "en"), (HINDI, "hi"), (MARATHI, "mr")]
+    inserted = 0
+    started = time.perf_counter()
+    while inserted < messages:
+        rows = []
+        for _ in range(min(chunk, messages - inserted)):
+            vocabulary, language = rng.choices(languages, weights=[6, 2, 2])[0]
+            message = sentence(rng, vocabulary, rng.randint(6, 20))
+            if rng.random() < 0.0002:
+                message += " " + rng.choice(RARE)
+            rows.append((rng.randint(1, users), message, sentence(rng, REPLY, 14), language))
+        with pool.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO chat_history (user_id, message, response, language) VALUES (?, ?, ?, ?)", rows
+            )
+        inserted += len(rows)
+    return time.perf_counter() - started
+
+
+def table_mb(conn, names):
+    total = 0
+    for name in names:
+        total += conn.execute(f"SELECT COALESCE(SUM(LENGTH(block)), 0) FROM {name}").fetchone()[0]
+    return total / 1e6
+
+
+def like_page(user_id, text, page_size=10):
+    pattern = f"%{text}%"
+    with pool.connection() as conn:
+        return conn.execute("""
+            SELECT id, message, response, timestamp FROM chat_history
+            WHERE user_id = ? AND (message LIKE ? OR response LIKE ?)
+            ORDER BY id DESC
+            LIMIT ?
+        """, (user_id, pattern, pattern, page_size)).fetchall()
+
+
+def percentiles_ms(samples):
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2] * 1000, ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)] * 1000
+
+
+def timed(fn, user_ids, text):
+    samples = []
+    hits = 0
+    for user_id in user_ids:
+        started = time.perf_counter()
+        result = fn(user_id, text)
+        samples.append(time.perf_counter() - started)
+        hits += bool(result[0] if isinstance(result, tuple) else result)
+    return percentiles_ms(samples), hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    database.init_database()
+    insert_seconds = populate(args.messages, args.users)
+    with pool.connection() as conn:
+        history_mb = conn.execute(
+            "SELECT SUM(LENGTH(message) + LENGTH(response)) FROM chat_history"
+        ).fetchone()[0] / 1e6
+        index_mb = table_mb(conn, ["chat_search_data"])
+        started = time.perf_counter()
+        conn.execute("INSERT INTO chat_search (chat_search) VALUES ('optimize')")
+        optimize_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        conn.execute("SELECT COUNT(*) FROM chat_history WHERE message LIKE '%insomnia%'").fetchone()
+        scan_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{args.messages} messages, {args.users} users: inserted through triggers in {insert_seconds:.1f}s "
+          f"({args.messages / insert_seconds:.0f} rows/s), optimize {optimize_seconds:.1f}s")
+    print(f"text {history_mb:.1f} MB, FTS index {index_mb:.1f} MB; "
+          f"LIKE over every user's messages {scan_ms:.0f} ms")
+
+    rng = random.Random(3)
+    user_ids = [rng.randint(1, args.users) for _ in range(args.queries)]
+    print(f"{'query':>13} {'FTS p50':>8} {'FTS p99':>8} {'LIKE p50':>9} {'LIKE p99':>9} {'users hit':>10}")
+    for label, text in QUERIES:
+        (fts_p50, fts_p99), hits = timed(search_chat_history, user_ids, text)
+        (like_p50, like_p99), _ = timed(like_page, user_ids, text)
+        print(f"{label:>13} {fts_p50:>8.2f} {fts_p99:>8.2f} {like_p50:>9.2f} {like_p99:>9.2f} "
+              f"{hits:>6}/{len(user_ids):<3}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Session restore latency: signed token lookup vs a full password login
+
+Usage: python scripts/bench_session_restore.py [--restores 5000] [--logins 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp(prefix="bench_sessions_")
+os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "sessions.db")
+os.environ["SESSION_SECRET_PATH"] = os.path.join(WORKDIR, "session_secret")
+os.environ["BCRYPT_ROUNDS_PATH"] = os.path.join(WORKDIR, "bcrypt_rounds")
+
+import auth
+import database
+import session_tokens
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def summarize(label, samples):
+    samples = sorted(samples)
+    p50 = samples[len(samples) // 2] * 1000
+    p99 = samples[min(int(len(samples) * 0.99), len(samples) - 1)] * 1000
+    print(f"{label:<22} {len(samples):>7} {p50:>9.3f} {p99:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--restores", type=int, default=5000)
+    parser.add_argument("--logins", type=int, default=20)
+    args = parser.parse_args()
+
+    database.init_database()
+    auth.calibrate_bcrypt_cost()
+    # Enough sessions that the lookup is not answered from a tiny table
+    for i in range(200):
+        auth.create_user(f"bench_user_{i}", "password123", f"bench_user_{i}@example.com")
+    tokens = [session_tokens.issue_session(user_id) for user_id in range(1, 201) for _ in range(5)]
+
+    logins = [timed(auth.authenticate_user, "bench_user_0", "password123")[0] for _ in range(args.logins)]
+    restores = []
+    for i in range(args.restores):
+        elapsed, restored = timed(session_tokens.restore_session, tokens[i % len(tokens)])
+        assert restored is not None
+        restores.append(elapsed)
+    forged = [timed(session_tokens.restore_session, token[:-2] + "xx")[0] for token in tokens[:1000]]
+
+    session_tokens.revoke_session(tokens[0])
+    assert session_tokens.restore_session(tokens[0]) is None
+
+    print(f"bcrypt cost {auth.get_bcrypt_rounds()}")
+    print(f"{'':<22} {'samples':>7} {'p50 ms':>9} {'p99 ms':>9}")
+    summarize("password login", logins)
+    summarize("token restore", restores)
+    summarize("forged token reject", forged)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare plain and draft-assisted local decoding through the inference worker
+
+Usage: python scripts/bench_speculative.py --model NAME --draft NAME [--turns 8] [--temperature 0.7]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_server import DecodingStats, InferenceWorker
+from model_registry import registry
+
+PROMPTS = [
+    "User: I have been feeling anxious about work lately.\n\nAssistant:",
+    "User: How can I sleep better when my mind keeps racing?\n\nAssistant:",
+    "User: What is a simple breathing exercise I can do right now?\n\nAssistant:",
+    "User: I feel lonely since moving to a new city.\n\nAssistant:",
+]
+
+
+def run(worker, turns, max_new_tokens, temperature):
+    # Never falls back, so the assisted run measures the draft on every turn
+    stats = DecodingStats(min_acceptance=0.0)
+    latencies = []
+    for turn in range(turns):
+        request = worker.submit(
+            PROMPTS[turn % len(PROMPTS)], max_new_tokens=max_new_tokens,
+            temperature=temperature, session_stats=stats
+        )
+        request.result()
+        latencies.append(request.finished_at - request.started_at)
+    return stats.snapshot(), statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--draft", required=True)
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument("--quantization", default="none")
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--temperature", type=float, default=0.7)
+    args = parser.parse_args()
+
+    loaded = registry.get(args.model, args.dtype, "cpu", args.quantization)
+    draft = registry.get(args.draft, args.dtype, "cpu", args.quantization)
+    if loaded is None or draft is None:
+        sys.exit("Could not load the model or the draft model")
+
+    workers = {
+        "plain": InferenceWorker(loaded, max_batch_size=1),
+        "assisted": InferenceWorker(loaded, max_batch_size=1, draft_model=draft),
+    }
+    if workers["assisted"].draft is None:
+        sys.exit("The draft model does not share the model's tokenizer")
+
+    print(f"{'mode':>9} {'tok/s':>8} {'p50 ms':>9} {'acceptance':>11}")
+    for mode, worker in workers.items():
+        stats, p50 = run(worker, args.turns, args.max_new_tokens, args.temperature)
+        acceptance = f"{stats['acceptance_rate']:.1%}" if stats["acceptance_rate"] is not None else "-"
+        print(f"{mode:>9} {stats['tokens_per_sec'][mode]:>8.1f} {p50 * 1000:>9.1f} {acceptance:>11}")
+
+
+if __name__ == "__main__":
+    main()
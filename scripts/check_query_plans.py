@@ -0,0 +1,113 @@
+"""Check that every query issued by the data-access modules uses an index
+
+Runs each data-access function against a scratch database, captures the
+SQL it executes and fails if EXPLAIN QUERY PLAN shows a full table scan.
+
+Usage: python scripts/check_query_plans.py
+
+tests/test_query_plans.py runs the same check under pytest.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if __name__ == "__main__":
+    # Settings are read at import; the test suite points them at its own files
+    WORKDIR = tempfile.mkdtemp(prefix="query_plans_")
+    os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "plans.db")
+    os.environ["SESSION_SECRET_PATH"] = os.path.join(WORKDIR, "session_secret")
+
+import auth
+import database
+import export
+import search
+import session_tokens
+from db_pool import pool
+from db_writer import get_db_writer
+
+
+def exercise():
+    """Call every data-access function once with realistic arguments"""
+    auth.create_user("plan_user", "password123")
+    user_id = database.get_user_id("plan_user")
+    auth.authenticate_user("plan_user", "password123")
+    auth.get_user_language(user_id)
+    auth.update_user_language(user_id, "Hindi")
+    database.save_chat_message(user_id, "hello", "hi there")
+    _, cursor = database.get_chat_history_page(user_id, limit=1)
+    database.get_chat_history_page(user_id, before_id=cursor or 1, limit=1)
+    database.save_mood_log(user_id, "Good", 6, "notes")
+    database.get_mood_history(user_id)
+    database.get_mood_data_version(user_id)
+    database.get_mood_stats(user_id)
+    database.get_mood_distribution(user_id)
+    database.get_mood_daily_series(user_id, "2024-01-01")
+    database.log_crisis_alert(user_id, "message")
+    database.log_crisis_alerts([(user_id, "message", "2024-01-01 00:00:00")])
+    database.update_therapy_progress(user_id, "anger_management", 20)
+    database.update_therapy_progress(user_id, "anger_management", 40)
+    database.get_therapy_progress(user_id, "anger_management")
+    search.search_chat_history(user_id, "hello", page=1)
+    search.search_mood_notes(user_id, "notes")
+    for table in export.EXPORT_TABLES:
+        list(export.iter_rows(table, user_id, chunk_rows=1))
+    token = session_tokens.issue_session(user_id)
+    session_tokens.restore_session(token)
+    _, token = session_tokens.rotate_session(token)
+    session_tokens.revoke_session(token)
+    session_tokens.revoke_user_sessions(user_id)
+    session_tokens.purge_expired_sessions()
+
+
+def full_scans(conn, statement):
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+    return [row[3] for row in plan if row[3].startswith("SCAN") and "INDEX" not in row[3]]
+
+
+def find_full_scans():
+    """Exercise the data-access functions on the initialised database
+
+    Returns the number of distinct queries checked and a list of
+    (statement, scans) for those whose plan has a full table scan.
+    """
+    statements = []
+    writer = get_db_writer()
+    with pool.connection() as conn:
+        # The pool hands this same connection back to every helper below;
+        # buffered writes run on the writer thread's connection instead
+        conn.set_trace_callback(statements.append)
+        writer.submit(lambda writer_conn: writer_conn.set_trace_callback(statements.append)).result()
+        try:
+            exercise()
+        finally:
+            writer.submit(lambda writer_conn: writer_conn.set_trace_callback(None)).result()
+            conn.set_trace_callback(None)
+
+        checked = 0
+        failures = []
+        for statement in dict.fromkeys(" ".join(s.split()) for s in statements):
+            if not statement.upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT")):
+                continue
+            # FTS5's own reads of its shadow tables, issued inside a MATCH
+            if "'main'." in statement:
+                continue
+            checked += 1
+            scans = full_scans(conn, statement)
+            if scans:
+                failures.append((statement, scans))
+    return checked, failures
+
+
+def main():
+    database.init_database()
+    checked, failures = find_full_scans()
+    for statement, scans in failures:
+        print(f"FULL SCAN: {statement}\n    {'; '.join(scans)}")
+    print(f"{checked} queries checked, {len(failures)} with full table scans")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Stream one user's full history to a file or stdout
+
+Usage: python scripts/export_user_data.py <username> [--table mood_logs] [--format csv|ndjson] [--zip] [-o out]
+Without --table every table is exported, which requires --zip.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from export import EXPORT_FORMATS, EXPORT_TABLES, iter_export, iter_zip
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("username")
+    parser.add_argument("--table", choices=list(EXPORT_TABLES))
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--zip", action="store_true")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    user_id = database.get_user_id(args.username)
+    if user_id is None:
+        parser.error(f"unknown user {args.username!r}")
+    if args.zip:
+        chunks = iter_zip(user_id, [args.table] if args.table else None, args.format)
+    elif args.table:
+        chunks = iter_export(args.table, user_id, args.format)
+    else:
+        parser.error("exporting every table needs --zip")
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
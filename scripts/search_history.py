@@ -0,0 +1,46 @@
+"""Search one user's chat history or mood notes from the command line
+
+Usage: python scripts/search_history.py <username> <words...> [--moods] [--page 0]
+Matches are shown between [ and ].
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from search import HIGHLIGHT_END, HIGHLIGHT_START, search_chat_history, search_mood_notes
+
+
+def plain(snippet):
+    return (snippet or "").replace(HIGHLIGHT_START, "[").replace(HIGHLIGHT_END, "]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("username")
+    parser.add_argument("words", nargs="+")
+    parser.add_argument("--moods", action="store_true", help="search mood notes instead of chats")
+    parser.add_argument("--page", type=int, default=0)
+    args = parser.parse_args()
+
+    user_id = database.get_user_id(args.username)
+    if user_id is None:
+        parser.error(f"unknown user {args.username!r}")
+    text = " ".join(args.words)
+    if args.moods:
+        results, has_more = search_mood_notes(user_id, text, args.page)
+        for _, mood, intensity, notes, timestamp in results:
+            print(f"{timestamp}  {mood} ({intensity}/10): {plain(notes)}")
+    else:
+        results, has_more = search_chat_history(user_id, text, args.page)
+        for _, message, response, timestamp in results:
+            print(f"{timestamp}  You: {plain(message)}")
+            print(f"{'':>21}Bot: {plain(response)}")
+    if has_more:
+        print(f"-- more results: --page {args.page + 1}")
+
+
+if __name__ == "__main__":
+    main()
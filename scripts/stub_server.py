@@ -0,0 +1,112 @@
+"""Local stand-in for the chat-completions API (and webhook receivers)
+
+Runs on 127.0.0.1 without network access. Counts TCP connections and
+requests so benchmarks and tests can see connection reuse, and can reject
+every Nth request (429 by default) to exercise retry behaviour.
+"""
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer each response so headers and body leave in one write (the
+    # handler flushes after every request); TCP_NODELAY covers responses
+    # larger than the buffer. Either alone avoids a keep-alive response
+    # stalling on Nagle plus the client's delayed ACK.
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        request_number = self.server.count("requests")
+        self.server.received.append(body)
+
+        if self.server.throttle_every and request_number % self.server.throttle_every == 0:
+            self.server.count("throttled")
+            headers = {"Retry-After": self.server.retry_after} if self.server.retry_after is not None else {}
+            self._send(self.server.throttle_status, b'{"error": "rate limited"}', headers)
+            return
+
+        if self.server.delay:
+            time.sleep(self.server.delay)
+
+        if body.get("stream"):
+            self._send_stream(self.server.reply)
+        else:
+            reply = {"choices": [{"message": {"role": "assistant", "content": self.server.reply}}]}
+            self._send(200, json.dumps(reply).encode())
+
+    def _send(self, status, payload, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_stream(self, text):
+        events = [
+            {"choices": [{"delta": {"content": word}}]}
+            for word in re.findall(r"\S+\s*", text)
+        ]
+        payload = b"".join(
+            b"data: " + json.dumps(event).encode() + b"\n\n" for event in events
+        ) + b"data: [DONE]\n\n"
+        self._send(200, payload, {"Content-Type": "text/event-stream"})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for hundreds of simultaneous connects from async benchmarks
+    request_queue_size = 1024
+
+    def __init__(self, reply="I'm here to listen.", throttle_every=0, delay=0.0,
+                 throttle_status=429, retry_after="0"):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.reply = reply
+        self.throttle_every = throttle_every
+        self.throttle_status = throttle_status
+        self.retry_after = retry_after
+        self.delay = delay
+        self.received = []
+        self.counters = {"connections": 0, "requests": 0, "throttled": 0}
+        self._counter_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-reply (hedged or cancelled requests) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+            return self.counters[name]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,86 @@
+import html
+
+from config import SEARCH_PAGE_SIZE, SEARCH_SNIPPET_TOKENS
+from db_pool import pool
+from db_writer import wait_for_user_writes
+
+# Snippet highlight markers; control characters never occur in chat text,
+# so the text can be escaped for HTML before they are swapped for <mark>
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+
+def build_match_query(user_id, text, columns):
+    """FTS5 query matching every word of text in columns, for one user only
+
+    Each whitespace-separated word is quoted, so operators and punctuation
+    typed by the user are matched as text rather than parsed as syntax.
+    Returns None when text contains no words.
+    """
+    words = text.split()
+    if not words:
+        return None
+    terms = " AND ".join('"' + word.replace('"', '""') + '"' for word in words)
+    return f'owner : "u{int(user_id)}" AND {{{" ".join(columns)}}} : ({terms})'
+
+
+def _search(query, params, page, page_size):
+    with pool.connection() as conn:
+        rows = conn.execute(query, params + (page_size + 1, page * page_size)).fetchall()
+    return rows[:page_size], len(rows) > page_size
+
+
+def search_chat_history(user_id, text, page=0, page_size=SEARCH_PAGE_SIZE):
+    """Rank a user's chat turns by relevance to text, one page at a time
+
+    Returns (results, has_more). Results are (id, message snippet, response
+    snippet, timestamp), best match first; words the user typed write more
+    than the bot's replies. Snippets mark matches with HIGHLIGHT_START/END.
+    Archived turns are not indexed.
+    """
+    match = build_match_query(user_id, text, ["message", "response"])
+    if match is None:
+        return [], False
+    wait_for_user_writes(user_id)
+    return _search(f"""
+        SELECT c.id,
+               snippet(chat_search, 1, ?, ?, '…', {SEARCH_SNIPPET_TOKENS}),
+               snippet(chat_search, 2, ?, ?, '…', {SEARCH_SNIPPET_TOKENS}),
+               c.timestamp
+        FROM chat_search
+        JOIN chat_history c ON c.id = chat_search.rowid
+        WHERE chat_search MATCH ?
+        ORDER BY bm25(chat_search, 0.0, 2.0, 1.0)
+        LIMIT ? OFFSET ?
+    """, (HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, match), page, page_size)
+
+
+def search_mood_notes(user_id, text, page=0, page_size=SEARCH_PAGE_SIZE):
+    """Rank a user's mood log notes by relevance to text, one page at a time
+
+    Returns (results, has_more). Results are (id, mood, intensity, notes
+    snippet, timestamp), best match first.
+    """
+    match = build_match_query(user_id, text, ["notes"])
+    if match is None:
+        return [], False
+    wait_for_user_writes(user_id)
+    return _search(f"""
+        SELECT m.id, m.mood, m.intensity,
+               snippet(mood_search, 1, ?, ?, '…', {SEARCH_SNIPPET_TOKENS}),
+               m.timestamp
+        FROM mood_search
+        JOIN mood_logs m ON m.id = mood_search.rowid
+        WHERE mood_search MATCH ?
+        ORDER BY bm25(mood_search, 0.0, 1.0)
+        LIMIT ? OFFSET ?
+    """, (HIGHLIGHT_START, HIGHLIGHT_END, match), page, page_size)
+
+
+def highlight_html(snippet):
+    """Escape a snippet for HTML and render its matches as <mark>"""
+    return (
+        html.escape(snippet or "")
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_END, "</mark>")
+    )
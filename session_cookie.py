@@ -0,0 +1,64 @@
+"""Session token cookie for the Streamlit app
+
+Streamlit has no cookie API, so the cookie is read from the headers of
+the browser's websocket request (sent when the page loads) and written by
+a zero-height component whose script sets it on the app's page. Set from
+script, the cookie cannot be HttpOnly; the app escapes every message it
+renders as HTML so no injected script can read it.
+"""
+import json
+from http.cookies import CookieError, SimpleCookie
+
+import streamlit.components.v1 as components
+
+SESSION_COOKIE = "mhc_session"
+
+
+def _page_load_headers():
+    # Private Streamlit API; the headers are captured once when the session's
+    # websocket opens and never change, whatever the browser stores later
+    try:
+        from streamlit.web.server.websocket_headers import _get_websocket_headers
+        return _get_websocket_headers() or {}
+    except Exception:
+        return {}
+
+
+def read_session_cookie():
+    """Session token the browser sent with this page load, or None"""
+    cookie = SimpleCookie()
+    try:
+        cookie.load(_page_load_headers().get("Cookie", ""))
+    except CookieError:
+        return None
+    morsel = cookie.get(SESSION_COOKIE)
+    return morsel.value if morsel else None
+
+
+def _set_cookie(value, max_age, only_if=None):
+    # SameSite=Strict keeps the cookie off cross-site requests; Secure is
+    # added whenever the app is served over https. With only_if, the cookie
+    # is left alone unless it still holds that value.
+    components.html(f"""
+        <script>
+            const page = window.parent;
+            const expected = {json.dumps(only_if)};
+            const current = page.document.cookie.split("; ")
+                .find(pair => pair.startsWith({json.dumps(SESSION_COOKIE + "=")}));
+            if (expected === null || current === {json.dumps(SESSION_COOKIE + "=")} + expected) {{
+                const secure = page.location.protocol === "https:" ? "; Secure" : "";
+                page.document.cookie = {json.dumps(f"{SESSION_COOKIE}={value}")}
+                    + "; Max-Age={int(max_age)}; Path=/; SameSite=Strict" + secure;
+            }}
+        </script>
+    """, height=0)
+
+
+def write_session_cookie(token, max_age):
+    """Store token in the browser for max_age seconds"""
+    _set_cookie(token, max_age)
+
+
+def clear_session_cookie(token):
+    """Remove the session cookie, unless another tab has replaced token since"""
+    _set_cookie("", 0, only_if=token)
@@ -0,0 +1,162 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+from config import SESSION_SECRET, SESSION_SECRET_PATH, SESSION_TTL_HOURS
+from db_pool import pool
+
+_secret = None
+_secret_lock = threading.Lock()
+
+
+def _load_secret():
+    """Signing key shared by every process serving the same database
+
+    SESSION_SECRET wins when set; otherwise a random key is created once in
+    SESSION_SECRET_PATH so tokens survive restarts.
+    """
+    if SESSION_SECRET:
+        return SESSION_SECRET.encode()
+    os.makedirs(os.path.dirname(SESSION_SECRET_PATH) or ".", exist_ok=True)
+    try:
+        fd = os.open(SESSION_SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(SESSION_SECRET_PATH, "rb") as f:
+            return f.read().strip()
+    key = secrets.token_hex(32).encode()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _get_secret():
+    global _secret
+    if _secret is None:
+        with _secret_lock:
+            if _secret is None:
+                _secret = _load_secret()
+    return _secret
+
+
+def _sign(payload):
+    digest = hmac.new(_get_secret(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def _parse(token):
+    """Session id and expiry of a well-signed token, else None"""
+    try:
+        session_id, expires, signature = token.split(".")
+        expires = int(expires)
+    except (AttributeError, ValueError):
+        return None
+    if not hmac.compare_digest(signature, _sign(f"{session_id}.{expires}")):
+        return None
+    return session_id, expires
+
+
+def _insert_session(conn, user_id, now, ttl_hours):
+    session_id = secrets.token_urlsafe(16)
+    expires = now + int(ttl_hours * 3600)
+    conn.execute("""
+        INSERT INTO sessions (id, user_id, created_at, expires_at)
+        VALUES (?, ?, ?, ?)
+    """, (session_id, user_id, now, expires))
+    return f"{session_id}.{expires}.{_sign(f'{session_id}.{expires}')}"
+
+
+def issue_session(user_id, ttl_hours=SESSION_TTL_HOURS):
+    """Create a session for user_id and return its signed token
+
+    The token is ``<session id>.<expiry>.<signature>``. The signature lets
+    forged or mangled tokens be rejected without touching the database; the
+    sessions row is what makes revocation possible.
+    """
+    with pool.transaction() as conn:
+        return _insert_session(conn, user_id, int(time.time()), ttl_hours)
+
+
+def restore_session(token):
+    """Return (user_id, username, preferred_language) for a live token, else None
+
+    One HMAC and one primary-key lookup; no password hashing.
+    """
+    parsed = _parse(token)
+    if parsed is None:
+        return None
+    session_id, expires = parsed
+    now = int(time.time())
+    if expires <= now:
+        return None
+    with pool.connection() as conn:
+        return conn.execute("""
+            SELECT users.id, users.username, users.preferred_language
+            FROM sessions JOIN users ON users.id = sessions.user_id
+            WHERE sessions.id = ? AND sessions.revoked_at IS NULL AND sessions.expires_at > ?
+        """, (session_id, now)).fetchone()
+
+
+def rotate_session(token, ttl_hours=SESSION_TTL_HOURS):
+    """Exchange a live token for a new one, returning (user row, new token) or None
+
+    The user row is (user_id, username, preferred_language), as from
+    restore_session. The old session is revoked in the same transaction, so
+    each token restores a login at most once and a copied token stops
+    working after the user's next visit.
+    """
+    parsed = _parse(token)
+    if parsed is None:
+        return None
+    session_id, expires = parsed
+    now = int(time.time())
+    if expires <= now:
+        return None
+    with pool.transaction() as conn:
+        revoked = conn.execute("""
+            UPDATE sessions SET revoked_at = ?
+            WHERE id = ? AND revoked_at IS NULL AND expires_at > ?
+        """, (now, session_id, now)).rowcount
+        if not revoked:
+            return None
+        user = conn.execute("""
+            SELECT users.id, users.username, users.preferred_language
+            FROM sessions JOIN users ON users.id = sessions.user_id
+            WHERE sessions.id = ?
+        """, (session_id,)).fetchone()
+        if user is None:
+            return None
+        return user, _insert_session(conn, user[0], now, ttl_hours)
+
+
+def revoke_session(token):
+    """Revoke the session behind token, e.g. on logout"""
+    parsed = _parse(token)
+    if parsed is None:
+        return False
+    with pool.transaction() as conn:
+        cursor = conn.execute(
+            "UPDATE sessions SET revoked_at = ? WHERE id = ? AND revoked_at IS NULL",
+            (int(time.time()), parsed[0])
+        )
+    return cursor.rowcount > 0
+
+
+def revoke_user_sessions(user_id):
+    """Revoke every session of a user, e.g. after a password change"""
+    with pool.transaction() as conn:
+        cursor = conn.execute(
+            "UPDATE sessions SET revoked_at = ? WHERE user_id = ? AND revoked_at IS NULL",
+            (int(time.time()), user_id)
+        )
+    return cursor.rowcount
+
+
+def purge_expired_sessions():
+    """Delete expired sessions; revoked ones go once they expire too"""
+    with pool.transaction() as conn:
+        cursor = conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (int(time.time()),))
+    return cursor.rowcount
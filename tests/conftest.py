@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# App modules live at the repository root; the stub server lives in scripts/
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+
+# Settings are read at import, so keep every file the app writes out of data/
+# and hash passwords at the cheapest cost before any app module is imported
+WORKDIR = tempfile.mkdtemp(prefix="mhc_tests_")
+for name, filename in (
+    ("DATABASE_PATH", "app.db"),
+    ("ARCHIVE_DATABASE_PATH", "archive.db"),
+    ("SESSION_SECRET_PATH", "session_secret"),
+    ("BCRYPT_ROUNDS_PATH", "bcrypt_rounds"),
+    ("CRISIS_ALERT_WAL_PATH", "crisis_alerts.wal"),
+):
+    os.environ[name] = os.path.join(WORKDIR, filename)
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["CRISIS_ALERT_WEBHOOK_URL"] = ""
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Point the shared connection pool at a fresh, migrated database"""
+    from database import init_database
+    from db_pool import pool
+    from db_writer import get_db_writer
+
+    pool.close_all()
+    monkeypatch.setattr(pool, "path", str(tmp_path / "app.db"))
+    init_database()
+    yield pool
+    get_db_writer().flush()
+    pool.close_all()
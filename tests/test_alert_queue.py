@@ -0,0 +1,57 @@
+import json
+import sqlite3
+
+import alert_queue
+from alert_queue import CrisisAlertQueue
+
+
+def stored_messages(pool):
+    with pool.connection() as conn:
+        return [row[0] for row in conn.execute("SELECT trigger_message FROM crisis_alerts ORDER BY id")]
+
+
+def test_unacked_alerts_are_replayed_after_a_crash(db, tmp_path):
+    wal_path = tmp_path / "alerts.wal"
+    records = [
+        {"seq": 0, "user_id": 1, "message": "delivered", "timestamp": "2024-01-01 00:00:00"},
+        {"seq": 1, "user_id": 1, "message": "pending", "timestamp": "2024-01-01 00:00:01"},
+    ]
+    # The previous process acked the first alert, then died mid-write
+    lines = [json.dumps(records[0]), json.dumps(records[1]), json.dumps({"ack": [0]}), '{"seq": 2, "us']
+    wal_path.write_text("\n".join(lines), encoding="utf-8")
+
+    alerts = CrisisAlertQueue(str(wal_path))
+    assert alerts.flush(5)
+    assert stored_messages(db) == ["pending"]
+    assert alerts.stats()["delivered"] == 1
+    assert wal_path.read_text(encoding="utf-8") == ""
+
+    # New alerts continue the sequence instead of reusing acked numbers
+    assert alerts.enqueue(1, "after restart") == 2
+
+
+def test_poison_alert_is_dead_lettered_without_blocking_the_batch(db, tmp_path, monkeypatch):
+    store = alert_queue.log_crisis_alerts
+    locked = []
+
+    def flaky_store(batch):
+        if not locked:
+            locked.append(True)
+            raise sqlite3.OperationalError("database is locked")
+        store(batch)
+
+    monkeypatch.setattr(alert_queue, "log_crisis_alerts", flaky_store)
+    wal_path = tmp_path / "alerts.wal"
+    alerts = CrisisAlertQueue(str(wal_path), retry_delay=0.01)
+    # user_id is NOT NULL, so this alert can never be stored
+    for user_id, message in ((1, "first"), (None, "poison"), (1, "last")):
+        alerts.enqueue(user_id, message)
+    assert alerts.flush(5)
+
+    assert stored_messages(db) == ["first", "last"]
+    stats = alerts.stats()
+    assert (stats["delivered"], stats["dead_lettered"], stats["queue_depth"]) == (2, 1, 0)
+    assert stats["write_failures"] >= 1
+    dead = [json.loads(line) for line in open(alerts.dead_letter_path, encoding="utf-8")]
+    assert [(record["message"], record["user_id"]) for record in dead] == [("poison", None)]
+    assert "NOT NULL" in dead[0]["error"]
@@ -0,0 +1,109 @@
+import asyncio
+import socket
+import time
+
+import pytest
+import requests
+
+import http_client
+from stub_server import StubServer
+
+PAYLOAD = {"messages": [{"role": "user", "content": "hi"}]}
+
+
+def test_keep_alive_reuses_one_connection():
+    session = http_client.build_session()
+    with StubServer() as server:
+        for _ in range(10):
+            response = http_client.post_json(server.url, PAYLOAD, session=session)
+            assert response.status_code == 200
+    session.close()
+    assert server.counters["requests"] == 10
+    assert server.counters["connections"] == 1
+
+
+def test_429_is_retried_after_retry_after():
+    session = http_client.build_session(max_retries=3, backoff=0)
+    with StubServer(throttle_every=2, retry_after="1") as server:
+        assert http_client.post_json(server.url, PAYLOAD, session=session).status_code == 200
+        started = time.perf_counter()
+        response = http_client.post_json(server.url, PAYLOAD, session=session)
+        elapsed = time.perf_counter() - started
+    assert response.status_code == 200
+    assert elapsed >= 0.9
+    assert server.counters["throttled"] == 1
+    assert server.counters["requests"] == 3
+
+
+def test_5xx_is_retried_with_backoff_until_retries_run_out():
+    session = http_client.build_session(max_retries=2, backoff=0.2)
+    with StubServer(throttle_every=1, throttle_status=500, retry_after=None) as server:
+        started = time.perf_counter()
+        response = http_client.post_json(server.url, PAYLOAD, session=session)
+        elapsed = time.perf_counter() - started
+    assert response.status_code == 500
+    assert server.counters["requests"] == 3
+    # No wait before the first retry, then backoff * 2 before the second
+    assert elapsed >= 0.4
+
+
+def test_read_timeout(monkeypatch):
+    monkeypatch.setattr(http_client, "API_READ_TIMEOUT", 0.2)
+    session = http_client.build_session()
+    with StubServer(delay=1.0) as server:
+        started = time.perf_counter()
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            http_client.post_json(server.url, PAYLOAD, session=session)
+    assert time.perf_counter() - started < 0.9
+    assert server.counters["requests"] == 1
+
+
+def test_connect_timeout(monkeypatch):
+    monkeypatch.setattr(http_client, "API_CONNECT_TIMEOUT", 0.2)
+    # A listener that never accepts: once its backlog is full, connects hang
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(0)
+    host, port = listener.getsockname()
+    held = []
+    try:
+        for _ in range(3):
+            client = socket.socket()
+            client.settimeout(0.2)
+            try:
+                client.connect((host, port))
+            except OSError:
+                pass
+            held.append(client)
+        session = http_client.build_session(max_retries=0)
+        started = time.perf_counter()
+        with pytest.raises(requests.exceptions.ConnectTimeout):
+            http_client.post_json(f"http://{host}:{port}", PAYLOAD, session=session)
+        assert time.perf_counter() - started < 0.9
+    finally:
+        for client in held:
+            client.close()
+        listener.close()
+
+
+def test_async_429_is_retried_after_retry_after_on_one_connection():
+    httpx = pytest.importorskip("httpx")
+
+    async def run(url):
+        async with httpx.AsyncClient() as client:
+            statuses = []
+            started = None
+            for _ in range(2):
+                started = time.perf_counter()
+                async with http_client.apost_json_stream(url, PAYLOAD, client=client, backoff=0) as response:
+                    await response.aread()
+                statuses.append(response.status_code)
+            return statuses, time.perf_counter() - started
+
+    with StubServer(throttle_every=2, retry_after="1") as server:
+        statuses, elapsed = asyncio.run(run(server.url))
+    assert statuses == [200, 200]
+    # The second call was throttled once and retried after Retry-After
+    assert elapsed >= 0.9
+    assert server.counters["requests"] == 3
+    assert server.counters["connections"] == 1
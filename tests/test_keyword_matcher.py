@@ -0,0 +1,30 @@
+from config import CRISIS_KEYWORDS
+from crisis_detection import CrisisDetector
+from keyword_matcher import KeywordMatcher
+
+
+def test_marathi_keyword_matches_visarga_and_colon_spellings():
+    matcher = KeywordMatcher(CRISIS_KEYWORDS)
+    for text in ("मला स्वतःला मारणे आहे", "मला स्वत:ला मारणे आहे"):
+        matches = matcher.find_all(text)
+        assert [match.keyword for match in matches] == ["स्वतःला मारणे"]
+        assert (matches[0].start, matches[0].end) == (4, 17)
+
+
+def test_colon_before_latin_keyword_is_a_word_boundary():
+    matcher = KeywordMatcher({"en": ["suicide"]})
+    assert matcher.search("reason:suicide")
+
+
+def test_precomposed_nukta_letters_match_plain_keywords():
+    detector = CrisisDetector("hi")
+    # U+0931 and U+0929 are canonically र/न plus nukta but survive NFKC
+    assert detector.detect_crisis("मऱना")
+    assert detector.detect_crisis("खुद को ऩुकसान")
+    matches = detector.find_crisis_keywords("मैं मऱना चाहता हूँ")
+    assert [(match.keyword, match.start, match.end) for match in matches] == [("मरना", 4, 8)]
+
+
+def test_keyword_shared_by_languages_is_reported_once():
+    matches = KeywordMatcher(CRISIS_KEYWORDS).find_all("आत्महत्या")
+    assert [(match.keyword, match.start, match.end) for match in matches] == [("आत्महत्या", 0, 9)]
@@ -0,0 +1,7 @@
+from check_query_plans import find_full_scans
+
+
+def test_every_data_access_query_uses_an_index(db):
+    checked, failures = find_full_scans()
+    assert checked > 20
+    assert failures == [], "\n".join(f"{statement}: {'; '.join(scans)}" for statement, scans in failures)
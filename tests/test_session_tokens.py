@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+import session_tokens
+from auth import create_user
+from database import get_user_id
+
+
+@pytest.fixture
+def user_id(db):
+    create_user("token_user", "password123")
+    return get_user_id("token_user")
+
+
+def test_issued_token_restores_the_user(user_id):
+    token = session_tokens.issue_session(user_id)
+    assert session_tokens.restore_session(token) == (user_id, "token_user", "English")
+
+
+def test_forged_or_mangled_tokens_are_rejected(user_id):
+    session_id, expires, _ = session_tokens.issue_session(user_id).split(".")
+    assert session_tokens.restore_session(f"{session_id}.{expires}.forged") is None
+    assert session_tokens.restore_session("not-a-token") is None
+    assert session_tokens.rotate_session(None) is None
+
+
+def test_rotate_replaces_the_token_once(user_id):
+    token = session_tokens.issue_session(user_id)
+    user, rotated = session_tokens.rotate_session(token)
+    assert user == (user_id, "token_user", "English")
+    assert rotated != token
+    assert session_tokens.restore_session(token) is None
+    assert session_tokens.restore_session(rotated) == user
+    # A copied or replayed token stops working once it has been used
+    assert session_tokens.rotate_session(token) is None
+
+
+def test_revoked_tokens_neither_restore_nor_rotate(user_id):
+    token = session_tokens.issue_session(user_id)
+    assert session_tokens.revoke_session(token)
+    assert not session_tokens.revoke_session(token)
+    assert session_tokens.restore_session(token) is None
+    assert session_tokens.rotate_session(token) is None
+
+
+def test_revoke_user_sessions_ends_every_session(user_id):
+    tokens = [session_tokens.issue_session(user_id) for _ in range(3)]
+    assert session_tokens.revoke_user_sessions(user_id) == 3
+    assert all(session_tokens.restore_session(token) is None for token in tokens)
+
+
+def test_expired_tokens_are_rejected_and_purged(user_id, monkeypatch):
+    token = session_tokens.issue_session(user_id, ttl_hours=1)
+    live = session_tokens.issue_session(user_id, ttl_hours=3)
+    later = time.time() + 2 * 3600
+    monkeypatch.setattr(session_tokens.time, "time", lambda: later)
+    assert session_tokens.restore_session(token) is None
+    assert session_tokens.rotate_session(token) is None
+    assert session_tokens.purge_expired_sessions() == 1
+    assert session_tokens.restore_session(live) is not None
@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+
+from config import MOOD_VIEW_CACHE_SIZE
+
+
+class LRUCache:
+    """Bounded, thread-safe least-recently-used cache of derived views
+
+    Keys are expected to embed a data version, so stale entries are never
+    invalidated explicitly: they simply stop being asked for and age out.
+    Two sessions racing on the same missing key may both build it; the
+    views are deterministic, so the second result just replaces the first.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """Return the cached value for key, building and storing it on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Build outside the lock so one slow view doesn't stall other sessions
+        value = build()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Mood page DataFrames and figures, keyed by (user, data version, view)
+mood_view_cache = LRUCache(MOOD_VIEW_CACHE_SIZE)